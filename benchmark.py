@@ -0,0 +1,267 @@
+import argparse
+import json
+import platform
+import time
+
+import numpy as np
+
+from snakeenv import SnakeEnv, BatchedSnakeEnv
+from snakeagent import SnakeAgent
+from neuralnetwork import PopulationNetwork
+from vision import deconstruct_batch
+from geneticalgorithm import repopulate, repopulate_into, make_selection, selection_strategies
+from weightstore import WeightStore
+from instrumentation import NullProfiler
+from scheduler import GenerationScheduler
+from gameplay import play_batched
+from seeding import env_rng, network_rngs, ga_rng
+import snaketest
+
+# Headless benchmarks for the training hot paths
+# Run: python benchmark.py --output results.json [--baseline old.json --threshold 0.1]
+
+# Times fn(i) for i in range(calls), returns the best calls/sec over a few repeats
+def measure(fn, calls, repeats=3):
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i in range(calls):
+            fn(i)
+        elapsed = time.perf_counter() - start
+        best = max(best, calls / elapsed)
+
+    return best
+
+# Helper for a result entry
+def result(value, unit, higher_is_better=True):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+# Agents with seeded starting weights
+def make_agents(num_agents, seed):
+    return [SnakeAgent(rng=rng) for rng in network_rngs(seed, num_agents)]
+
+# Random legal-ish play, resets whenever the snake dies
+def bench_env_step(dimensions, calls, seed):
+    rng = np.random.default_rng(seed)
+    env = SnakeEnv(dimensions, rng=env_rng(seed, 0, 0))
+    env.reset()
+    actions = rng.integers(0, 3, calls)
+
+    def step(i):
+        if not env.step(actions[i]):
+            env.reset()
+
+    return result(measure(step, calls), "steps/sec")
+
+def bench_batched_env_step(dimensions, num_envs, calls, seed):
+    rng = np.random.default_rng(seed)
+    env = BatchedSnakeEnv(num_envs, dimensions, rngs=[env_rng(seed, 0, i) for i in range(num_envs)])
+    env.reset()
+    actions = rng.integers(0, 3, (calls, num_envs))
+
+    def step(i):
+        if not env.step(actions[i]).any():
+            env.reset()
+
+    # Count every game that moved
+    return result(measure(step, calls) * num_envs, "env steps/sec")
+
+def bench_vision(dimensions, calls, seed):
+    agent = make_agents(1, seed)[0]
+    env = SnakeEnv(dimensions, rng=env_rng(seed, 0, 0))
+    env.reset()
+
+    return result(measure(lambda i: agent.deconstruct_grid(env), calls), "calls/sec")
+
+def bench_batched_vision(dimensions, num_envs, calls, seed):
+    env = BatchedSnakeEnv(num_envs, dimensions, rngs=[env_rng(seed, 0, i) for i in range(num_envs)])
+    env.reset()
+
+    return result(measure(lambda i: deconstruct_batch(env), calls) * num_envs, "agent inputs/sec")
+
+def bench_predict(calls, seed):
+    agent = make_agents(1, seed)[0]
+    inputs = np.random.default_rng(seed).random(22)
+
+    return result(measure(lambda i: agent.brain.predict(inputs), calls), "forward passes/sec")
+
+def bench_population_predict(num_agents, calls, seed):
+    agents = make_agents(num_agents, seed)
+    network = PopulationNetwork([agent.brain for agent in agents])
+    inputs = np.random.default_rng(seed).random((num_agents, 22))
+
+    return result(measure(lambda i: network.predict(inputs), calls) * num_agents, "forward passes/sec")
+
+# Gives agents made-up results so fitness has something to work with
+def fake_results(agents, rng):
+    for agent in agents:
+        agent.score = int(rng.integers(0, 5))
+        agent.steps = int(rng.integers(1, 200))
+        agent.steps_without_food = int(rng.integers(0, 100))
+
+def bench_repopulate(num_agents, calls, seed):
+    rng = ga_rng(seed)
+    agents = make_agents(num_agents, seed)
+    fake_results(agents, rng)
+    num_offspring = num_agents * 5 // 6
+
+    seconds = 1 / measure(lambda i: repopulate(agents, num_offspring, rng), calls)
+
+    return result(seconds, "sec/generation", higher_is_better=False)
+
+def bench_repopulate_into(num_agents, calls, seed):
+    rng = ga_rng(seed)
+    agents = make_agents(num_agents, seed)
+    fake_results(agents, rng)
+    num_offspring = num_agents * 5 // 6
+
+    store = WeightStore(num_agents, agents[0].brain.neurons)
+    store.bind(agents)
+
+    seconds = 1 / measure(lambda i: repopulate_into(agents, num_offspring, store, rng=rng), calls)
+
+    return result(seconds, "sec/generation", higher_is_better=False)
+
+# Full headless generations, including play and reproduction
+def bench_generations(dimensions, num_agents, generations, batched, seed):
+    num_offspring = num_agents * 5 // 6
+
+    start = time.perf_counter()
+    # Nothing written to disk, so the user's brain.pkl is left alone and I/O isn't timed
+    snaketest.evaluate(num_agents, generations, num_offspring, dimensions, None, batched, seed=seed, checkpoints=False)
+    elapsed = time.perf_counter() - start
+
+    return result(generations / elapsed, "generations/sec")
+
+# Generations until the best agent reaches target, capped at max_generations
+def generations_to_target(selection, dimensions, num_agents, target, max_generations, seed):
+    rng = ga_rng(seed)
+
+    agents = make_agents(num_agents, seed)
+    store = WeightStore(num_agents, agents[0].brain.neurons)
+    store.bind(agents)
+
+    env = BatchedSnakeEnv(num_agents, dimensions)
+    network = PopulationNetwork([agent.brain for agent in agents], store)
+    select = make_selection(selection)
+
+    for gen in range(max_generations):
+        play_batched(agents, env, network, None, None, gen, dimensions, NullProfiler(), GenerationScheduler(), seed)
+
+        if max(agent.score for agent in agents) >= target:
+            return gen + 1
+
+        repopulate_into(agents, num_agents * 5 // 6, store, select, rng)
+
+    return max_generations
+
+# Convergence speed for every selection strategy, averaged over a few seeds
+def bench_selection(quick=False, seed=0):
+    seeds = [seed] if quick else [seed, seed + 1, seed + 2]
+    target = 2 if quick else 3
+    max_generations = 20 if quick else 60
+
+    results = {}
+    for name in selection_strategies:
+        generations = [generations_to_target(name, [10, 10], 150, target, max_generations, s) for s in seeds]
+        results[f"selection/{name}"] = result(float(np.mean(generations)), f"generations to score {target}", higher_is_better=False)
+        print(f"selection/{name}: {results[f'selection/{name}']['value']:.4g} generations")
+
+    return results
+
+def run(quick=False, seed=0, selection=False):
+    scale = 0.2 if quick else 1.0
+    calls = lambda n: max(1, int(n * scale))
+
+    board_sizes = [[15, 15], [40, 40]]
+    population_sizes = [150, 1000] if quick else [150, 1000, 5000]
+
+    benchmarks = {}
+    for rows, cols in board_sizes:
+        size = f"{rows}x{cols}"
+        benchmarks[f"env_step/{size}"] = lambda d=[rows, cols]: bench_env_step(d, calls(20000), seed)
+        benchmarks[f"batched_env_step/{size}/150"] = lambda d=[rows, cols]: bench_batched_env_step(d, 150, calls(500), seed)
+        benchmarks[f"vision/{size}"] = lambda d=[rows, cols]: bench_vision(d, calls(5000), seed)
+        benchmarks[f"batched_vision/{size}/150"] = lambda d=[rows, cols]: bench_batched_vision(d, 150, calls(500), seed)
+
+    benchmarks["predict"] = lambda: bench_predict(calls(20000), seed)
+    benchmarks["population_predict/150"] = lambda: bench_population_predict(150, calls(500), seed)
+
+    for num_agents in population_sizes:
+        benchmarks[f"repopulate/{num_agents}"] = lambda n=num_agents: bench_repopulate(n, calls(5), seed)
+        benchmarks[f"repopulate_into/{num_agents}"] = lambda n=num_agents: bench_repopulate_into(n, calls(5), seed)
+
+    for rows, cols in board_sizes:
+        for num_agents in [50, 150]:
+            for batched in [False, True]:
+                mode = "batched" if batched else "serial"
+                name = f"generations/{rows}x{cols}/{num_agents}/{mode}"
+                benchmarks[name] = lambda d=[rows, cols], n=num_agents, b=batched: bench_generations(d, n, calls(10), b, seed)
+
+    # Every benchmark builds its own Generators from seed, so they all start from the same random state
+    results = {}
+    for name, bench in benchmarks.items():
+        results[name] = bench()
+        print(f"{name}: {results[name]['value']:.4g} {results[name]['unit']}")
+
+    # Slow, so only when asked for
+    if selection:
+        results.update(bench_selection(quick, seed))
+
+    return {
+        "meta": {
+            "seed": seed,
+            "quick": quick,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+# Returns the names of benchmarks that got worse than the baseline by more than threshold
+def compare(results, baseline, threshold):
+    regressions = []
+
+    for name, entry in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+
+        old = baseline["results"][name]["value"]
+        new = entry["value"]
+        change = (new - old) / old
+
+        # Flip the sign for timings so a positive change always means faster
+        if not entry["higher_is_better"]:
+            change = -change
+
+        print(f"{name}: {change:+.1%}")
+        if change < -threshold:
+            regressions.append(name)
+
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the training hot paths.")
+    parser.add_argument("--output", default="benchmark.json", help="Where to write the results")
+    parser.add_argument("--baseline", default=None, help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown before failing (0.1 = 10%%)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations and smaller populations")
+    parser.add_argument("--selection", action="store_true", help="Also compare generations to a target score for each selection strategy")
+    args = parser.parse_args()
+
+    results = run(args.quick, args.seed, args.selection)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            exit(1)
@@ -0,0 +1,163 @@
+import copy
+import os
+import pickle
+import queue
+import threading
+
+import numpy as np
+from weightformat import save_network, save_population, WeightArchive
+# Saves the best brain and the whole population from a background thread
+
+# Writes with pickle to a temp file and renames it over the target, so a crash never leaves half a file
+def atomic_pickle(obj, path):
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        pickle.dump(obj, f)
+
+    os.replace(temp, path)
+
+# Same as atomic_pickle, for anything written by a save function taking a path
+def atomic_save(save, path, *args):
+    temp = path + ".tmp"
+    save(temp, *args)
+
+    os.replace(temp, path)
+
+def checkpoint_path(directory, generation, extension="pkl"):
+    return os.path.join(directory, f"gen_{generation:06d}.{extension}")
+
+# Loads a population checkpoint, given a file or a directory (newest checkpoint in it)
+def load_checkpoint(path):
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.startswith("gen_") and name.endswith(".pkl"))
+        if not names:
+            raise ValueError(f"Error: No checkpoints found in {path}.")
+
+        path = os.path.join(path, names[-1])
+
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+
+    # Population weights sit next to the pickle in the flat binary format
+    state["weights"] = WeightArchive(path[:-len("pkl")] + "snkw").flat
+
+    return state
+
+class CheckpointManager:
+    def __init__(self, brain_path="brain.pkl", directory="checkpoints", interval=1, keep=3, weights_path="brain.snkw", weights_dtype=np.float32):
+        if interval <= 0:
+            raise ValueError("Error: Checkpoint interval must be at least 1.")
+
+        self.brain_path = brain_path
+        self.weights_path = weights_path
+        self.weights_dtype = weights_dtype
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+
+        # Best brain seen so far, kept in memory and only written when it improves
+        self.best_brain = None
+        self.best_score = -1
+
+        # Single writer thread, jobs are (function, args) with data already copied
+        self.jobs = queue.Queue()
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def write_loop(self):
+        while(True):
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            function, args = job
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"Error writing checkpoint, {e}")
+
+    # Call once per generation before the weights get replaced
+    def update_best(self, agents):
+        best_agent = max(agents, key=lambda a: a.score)
+        if best_agent.score <= self.best_score:
+            return
+
+        # Copy now, the agent's weights are overwritten by repopulate
+        self.best_score = best_agent.score
+        self.best_brain = copy.deepcopy(best_agent.brain)
+
+        self.jobs.put((atomic_pickle, (self.best_brain, self.brain_path)))
+        if self.weights_path is not None:
+            self.jobs.put((atomic_save, (save_network, self.weights_path, self.best_brain, self.weights_dtype)))
+
+    # Call once per generation after repopulate, saves everything needed to resume at generation
+    def save_population(self, generation, store, seed=None, rng=None):
+        if generation % self.interval != 0:
+            return
+
+        state = {
+            "generation": generation,
+            "neurons": store.neurons,
+            "shapes": store.shapes,
+            "activations": store.activations,
+            "weights": store.flat.copy(),
+            "rng_state": None if rng is None else rng.bit_generator.state,
+            "seed": seed,
+            "best_score": self.best_score,
+            "best_brain": self.best_brain
+        }
+
+        self.jobs.put((self.write_population, (state,)))
+
+    def write_population(self, state):
+        os.makedirs(self.directory, exist_ok=True)
+        generation = state["generation"]
+
+        # Weights are written at full precision so resuming is exact, the pickle goes last so it marks a finished checkpoint
+        weights = state.pop("weights")
+        atomic_save(save_population, checkpoint_path(self.directory, generation, "snkw"), weights, state["shapes"], state["activations"], weights.dtype)
+        atomic_pickle(state, checkpoint_path(self.directory, generation))
+
+        # Only keep the newest checkpoints if asked to
+        if self.keep is not None:
+            old = generation - self.keep * self.interval
+            for extension in ["pkl", "snkw"]:
+                if old >= 0 and os.path.exists(checkpoint_path(self.directory, old, extension)):
+                    os.remove(checkpoint_path(self.directory, old, extension))
+
+    # Picks up where a checkpoint left off, returns the generation to start from
+    def restore(self, state, store, rng=None):
+        store.flat[...] = state["weights"]
+
+        # The GA's Generator picks up where it left off (checkpoints from before per-component Generators have none)
+        if rng is not None and isinstance(state["rng_state"], dict):
+            rng.bit_generator.state = state["rng_state"]
+
+        self.best_score = state["best_score"]
+        self.best_brain = state["best_brain"]
+
+        return state["generation"]
+
+    # Waits for every pending write to finish
+    def close(self):
+        self.jobs.put(None)
+        self.writer.join()
+
+# Same calls as CheckpointManager, but nothing is written (resuming still works)
+class NullCheckpoints:
+    def update_best(self, agents):
+        return None
+
+    def save_population(self, generation, store, seed=None, rng=None):
+        return None
+
+    def restore(self, state, store, rng=None):
+        store.flat[...] = state["weights"]
+
+        if rng is not None and isinstance(state["rng_state"], dict):
+            rng.bit_generator.state = state["rng_state"]
+
+        return state["generation"]
+
+    def close(self):
+        return None
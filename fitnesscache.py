@@ -0,0 +1,48 @@
+import hashlib
+from collections import OrderedDict
+# Remembers episode results per genome so unchanged survivors and clones aren't replayed
+
+class FitnessCache:
+    def __init__(self, max_entries=10000):
+        if max_entries <= 0:
+            raise ValueError("Error: Cache size must be at least 1.")
+
+        self.max_entries = max_entries
+
+        # Least recently used entries are at the front
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    # Hash of a network's weight bytes plus whatever evaluation settings the results depend on
+    def key(self, layers, config):
+        digest = hashlib.blake2b(repr(config).encode(), digest_size=16)
+        for layer in layers:
+            digest.update(str(layer.dtype).encode())
+            digest.update(layer.tobytes())
+
+        return digest.digest()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+
+        # Evict the least recently used genomes
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,142 @@
+import numpy as np
+from snakeenv import winning_score
+from vision import deconstruct_batch
+from geneticalgorithm import fitness, fitness_values
+from seeding import env_rng
+# Plays one generation of the population, shared by the trainer and the islands so neither pulls in the other's imports
+# renderer can be None when render_mode is None, nothing is drawn then
+
+# Plays one generation with each agent stepping its own SnakeEnv (with a root seed, agent i's food comes from env_rng(seed, gen, i))
+def play_serial(pairs, renderer, render_mode, gen, env_dimensions, profiler, scheduler, seed=None):
+    # Put agents into a list so we can remove them one by one
+    agents = list(pairs.keys())
+    
+    # Reset each agent's environment and values
+    for index, (agent, env) in enumerate(pairs.items()):
+        env.reset(None if seed is None else env_rng(seed, gen, index))
+        agent.score = 0
+        agent.alive = True
+        agent.steps = 0
+        agent.steps_without_food = 0
+
+    # All agents equal at the start
+    best_agent = agents[0]
+
+    scheduler.start(len(agents))
+
+    while(True):
+        with profiler.phase("render"):
+            if render_mode == "single":
+                renderer.render_single(list(pairs.values())[0].grid, list(pairs.keys())[0].score, gen)
+            elif render_mode == "overlay":
+                renderer.render_overlay(
+                    [env.grid for env in pairs.values()],
+                    [agent.alive for agent in agents],
+                    max(agent.score for agent in agents),
+                    gen
+                )
+            elif render_mode == "best":
+                renderer.render_single(pairs[best_agent].grid, best_agent.score, gen)
+        
+        # Move to next episode when all agents die or the generation is out of steps/time
+        if not scheduler.active or scheduler.out_of_budget():
+            break
+
+        # Copy since dead agents are removed while looping
+        for index in list(scheduler.active):
+            agent = agents[index]
+
+            # Each agent takes an action according to their gene policy
+            with profiler.phase("vision"):
+                inputs = agent.deconstruct_grid(pairs[agent])
+
+            with profiler.phase("inference"):
+                action = agent.brain.predict_action(inputs)
+                agent.steps += 1
+
+            # Update agent's info
+            with profiler.phase("env_step"):
+                agent.alive = pairs[agent].step(action)
+            agent.score = pairs[agent].score
+            agent.steps_without_food = pairs[agent].steps_without_food
+
+            # Agent beat the game, and therefore has the optimal policy
+            if agent.score == winning_score(env_dimensions):
+                return agent
+
+            if not agent.alive:
+                scheduler.remove(index, fitness(agent))
+
+        scheduler.tick()
+
+        # Stop agents that can't reach the top k anymore
+        if scheduler.can_cut():
+            scores = [agent.score for agent in agents]
+            steps = [agent.steps for agent in agents]
+
+            for index in scheduler.hopeless(scores, steps):
+                agents[index].alive = False
+                scheduler.remove(index, fitness(agents[index]))
+
+    return None
+
+# Plays one generation with every game in one BatchedSnakeEnv and one forward pass for the population per step
+def play_batched(agents, env, network, renderer, render_mode, gen, env_dimensions, profiler, scheduler, seed=None):
+    # Same food streams as play_serial when there's a root seed
+    env.reset(None if seed is None else [env_rng(seed, gen, index) for index in range(len(agents))])
+
+    # Pick up the weights from the last repopulate
+    network.load()
+
+    winner = None
+
+    scheduler.start(len(agents))
+
+    while(True):
+        with profiler.phase("render"):
+            if render_mode == "single" or render_mode == "best":
+                renderer.render_single(env.grid[0], env.score[0], gen)
+            elif render_mode == "overlay":
+                renderer.render_overlay(env.grid, env.alive, env.score.max(), gen)
+
+        # Move to next episode when all agents die or the generation is out of steps/time
+        if not scheduler.active or scheduler.out_of_budget():
+            break
+
+        # Every live agent takes an action according to their gene policy
+        with profiler.phase("vision"):
+            inputs = deconstruct_batch(env, network.compute_dtype)
+
+        with profiler.phase("inference"):
+            actions = network.predict_actions(inputs, env.alive)
+
+        with profiler.phase("env_step"):
+            was_alive = env.alive.copy()
+            env.step(actions)
+
+        # Agents that died this step leave the active list
+        died = np.flatnonzero(was_alive & ~env.alive)
+        for index, value in zip(died, fitness_values(env.score[died], env.steps[died], env.steps_without_food[died])):
+            scheduler.remove(index, value)
+
+        scheduler.tick()
+
+        # Stop agents that can't reach the top k anymore
+        for index in scheduler.hopeless(env.score, env.steps):
+            env.alive[index] = False
+            scheduler.remove(index, fitness_values(env.score[index], env.steps[index], env.steps_without_food[index]))
+
+        # Agent beat the game, and therefore has the optimal policy
+        beaten = np.flatnonzero(env.score == winning_score(env_dimensions))
+        if len(beaten) > 0:
+            winner = agents[beaten[0]]
+            break
+
+    # Copy results back for repopulate
+    for i, agent in enumerate(agents):
+        agent.score = int(env.score[i])
+        agent.alive = bool(env.alive[i])
+        agent.steps = int(env.steps[i])
+        agent.steps_without_food = int(env.steps_without_food[i])
+
+    return winner
@@ -1,7 +1,10 @@
 import numpy as np
 
+# Every operator takes an np.random.Generator (rng), a fresh unseeded one is used if it's None
+
 # Decides how offspring are created from parent weights
-def genetic_operator(parent_a, parent_b):
+def genetic_operator(parent_a, parent_b, rng=None):
+    rng = np.random.default_rng(rng)
     layers_a = parent_a.brain.layers
     layers_b = parent_b.brain.layers
 
@@ -9,7 +12,7 @@ def genetic_operator(parent_a, parent_b):
 
     # For each layer, pick each weight from a parent with 50% chance
     for i in range(parent_a.brain.num_layers - 1): # 4 layers = 3 sets of weights
-        mask = np.random.rand(*layers_a[i].shape) < 0.5
+        mask = rng.random(layers_a[i].shape) < 0.5
 
         # If in mask, take from one parent, if not, take from the other parent
         child_layer = np.where(mask, layers_a[i], layers_b[i]).copy()
@@ -18,7 +21,8 @@ def genetic_operator(parent_a, parent_b):
     return child_weights
 
 # Randomly alters an agent's weights
-def mutate(child_weights):
+def mutate(child_weights, rng=None):
+    rng = np.random.default_rng(rng)
     mutated_weights = []
 
     # 10% chance to mutate a weight in each layer
@@ -26,10 +30,10 @@ def mutate(child_weights):
         mutated_layer = layer.copy()
 
         # 10% chance for any weight to be mutated
-        mask = np.random.rand(*layer.shape) < 0.1
+        mask = rng.random(layer.shape) < 0.1
 
         # Add some noise to the layer
-        mutated_layer[mask] += np.random.normal(0, 0.15, size=np.sum(mask))
+        mutated_layer[mask] += rng.normal(0, 0.15, size=np.sum(mask))
         mutated_weights.append(mutated_layer)
     
     return mutated_weights
@@ -44,6 +48,10 @@ def softmax(scores):
 
 # Fitness of agent is based on their score/steps
 def fitness(agent):
+    # Already worked out over several episodes
+    if agent.fitness is not None:
+        return agent.fitness
+
     if agent.steps_without_food >= 90:
         total_fitness = -9999999
     else:
@@ -51,8 +59,24 @@ def fitness(agent):
 
     return total_fitness
 
+# Same as fitness, but from raw values so it works on whole arrays at once
+def fitness_values(score, steps, steps_without_food):
+    score = np.asarray(score)
+    steps = np.asarray(steps)
+    steps_without_food = np.asarray(steps_without_food)
+
+    total_fitness = (score * 50000) + (steps * 5) - (steps_without_food * 20)
+
+    return np.where(steps_without_food >= 90, -9999999, total_fitness)
+
+# Highest fitness an agent can still reach in remaining steps (at most one food per step, no timer penalty)
+def best_possible_fitness(score, steps, remaining):
+    return ((score + remaining) * 50000) + ((steps + remaining) * 5)
+
 # Creates offspring from the current agents
-def reproduce(population, num_offspring):
+def reproduce(population, num_offspring, rng=None):
+    rng = np.random.default_rng(rng)
+
     # Take parents using probability based on fitness (score)
     scores = np.array([fitness(agent) for agent in population])
 
@@ -65,17 +89,17 @@ def reproduce(population, num_offspring):
     # Create offspring
     for _ in range(num_offspring):
         # Drawn with replacement, this can result in cloning, but that might be beneficial
-        parent_a = np.random.choice(population, p=probabilities)
-        parent_b = np.random.choice(population, p=probabilities)
+        parent_a = population[rng.choice(len(population), p=probabilities)]
+        parent_b = population[rng.choice(len(population), p=probabilities)]
 
         # parent_a = population[np.argmax([a.score for a in population])]
         # parent_b = parent_a
         
         # Create offspring based on parents
-        child_weights = genetic_operator(parent_a, parent_b)
+        child_weights = genetic_operator(parent_a, parent_b, rng)
         
         # Mutate the child!!!
-        mutated_weights = mutate(child_weights)
+        mutated_weights = mutate(child_weights, rng)
 
         children.append(mutated_weights)
 
@@ -96,12 +120,12 @@ def cull(population, num_offspring):
     return layers
 
 # Takes in old population and produces new population
-def repopulate(agents, num_offspring):
+def repopulate(agents, num_offspring, rng=None):
     # Copy so we can edit 
     population = agents.copy()
 
     # Make new offspring weights (returns list of children weights = list of list of np arrays)
-    children = reproduce(population, num_offspring)
+    children = reproduce(population, num_offspring, rng)
 
     # Cull worst of the old weights (list of list of np arrays)
     survived = cull(population, num_offspring)
@@ -109,4 +133,105 @@ def repopulate(agents, num_offspring):
     # Concatenate survived weights and new offspring weights
     population = survived + children
 
-    return population
\ No newline at end of file
+    return population
+
+# Parent selection strategies, each draws a whole (offspring, 2) array of parent indices at once from rng
+
+# Softmax on raw fitness, what reproduce uses (fitness is ~50000 * score, so this is close to always picking the best)
+def select_fitness_softmax(scores, shape, rng=None):
+    return np.random.default_rng(rng).choice(len(scores), size=shape, p=softmax(scores))
+
+# Softmax on standardized fitness, temperature controls how greedy it is
+def select_softmax(scores, shape, rng=None, temperature=1.0):
+    scores = np.asarray(scores, dtype=float)
+    spread = scores.std()
+    normalized = (scores - scores.mean()) / spread if spread > 0 else np.zeros_like(scores)
+
+    return np.random.default_rng(rng).choice(len(scores), size=shape, p=softmax(normalized / temperature))
+
+# Best of size random agents, for every parent at once
+def select_tournament(scores, shape, rng=None, size=3):
+    scores = np.asarray(scores)
+    candidates = np.random.default_rng(rng).integers(0, len(scores), size=(*shape, size))
+
+    return np.take_along_axis(candidates, np.argmax(scores[candidates], axis=-1)[..., None], axis=-1)[..., 0]
+
+# Linear ranking, pressure between 1 (uniform) and 2 (worst agent never picked)
+def select_rank(scores, shape, rng=None, pressure=1.5):
+    n = len(scores)
+    if n == 1:
+        return np.zeros(shape, dtype=np.intp)
+
+    ranks = np.empty(n)
+    ranks[np.argsort(scores, kind="stable")] = np.arange(n)
+
+    probabilities = (2 - pressure) / n + 2 * ranks * (pressure - 1) / (n * (n - 1))
+
+    return np.random.default_rng(rng).choice(n, size=shape, p=probabilities)
+
+# Uniform over the best fraction of agents
+def select_truncation(scores, shape, rng=None, fraction=0.2):
+    top = np.argsort(scores, kind="stable")[::-1][:max(1, int(len(scores) * fraction))]
+
+    return top[np.random.default_rng(rng).integers(0, len(top), size=shape)]
+
+selection_strategies = {
+    "fitness_softmax": select_fitness_softmax,
+    "softmax": select_softmax,
+    "tournament": select_tournament,
+    "rank": select_rank,
+    "truncation": select_truncation
+}
+
+# Returns a selection function with its parameters filled in, e.g. make_selection("tournament", size=5)
+def make_selection(name, **params):
+    if name not in selection_strategies:
+        raise ValueError(f"Error: Unknown selection strategy {name}.")
+
+    strategy = selection_strategies[name]
+
+    return lambda scores, shape, rng=None: strategy(scores, shape, rng, **params)
+
+# Same as reproduce, but over a flat (agents, parameters) weight matrix with every draw made in one call
+def reproduce_flat(flat, scores, num_offspring, out=None, selection=None, rng=None):
+    rng = np.random.default_rng(rng)
+    num_params = flat.shape[1]
+
+    # Raw fitness softmax unless told otherwise, same as reproduce
+    if selection is None:
+        selection = select_fitness_softmax
+
+    # Every parent pair at once, drawn with replacement like reproduce
+    parents = selection(scores, (num_offspring, 2), rng)
+
+    if out is None:
+        out = np.empty((num_offspring, num_params), dtype=flat.dtype)
+
+    # Pick each weight from a parent with 50% chance (float32 draws are plenty for a coin flip, and faster)
+    mask = rng.random((num_offspring, num_params), dtype=np.float32) < 0.5
+    np.copyto(out, flat[parents[:, 1]])
+    np.copyto(out, flat[parents[:, 0]], where=mask)
+
+    # 10% chance for any weight to be mutated
+    mask = rng.random((num_offspring, num_params), dtype=np.float32) < 0.1
+    out[mask] += rng.normal(0, 0.15, size=np.count_nonzero(mask))
+
+    return out
+
+# Same as repopulate, but builds the new population straight into a WeightStore's flat buffer
+def repopulate_into(agents, num_offspring, store, selection=None, rng=None):
+    flat = store.flat
+
+    # Take parents using probability based on fitness (score)
+    scores = np.array([fitness(agent) for agent in agents])
+
+    # Offspring are built in scratch rows so parents aren't overwritten while still needed
+    children = reproduce_flat(flat, scores, num_offspring, store.scratch(num_offspring), selection, rng)
+
+    # Survivors go first (best score first), then the offspring
+    cull_amount = len(agents) - num_offspring
+    agent_scores = np.array([agent.score for agent in agents])
+    survivors = np.argsort(-agent_scores, kind="stable")[:cull_amount]
+
+    flat[:cull_amount] = flat[survivors]
+    flat[cull_amount:] = children
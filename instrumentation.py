@@ -0,0 +1,117 @@
+import csv
+import json
+import time
+from contextlib import nullcontext
+
+import numpy as np
+# Opt-in timing and stats for the training loop, one record per generation
+
+# Times one phase, adds to the profiler's totals when the block ends
+class PhaseTimer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+
+        totals = self.profiler.phases.setdefault(self.name, [0.0, 0])
+        totals[0] += elapsed
+        totals[1] += 1
+
+        return False
+
+class Profiler:
+    def __init__(self, callbacks=None):
+        # Every callback gets each generation's record (a dict)
+        self.callbacks = callbacks if callbacks is not None else []
+
+        self.phases = {}
+        self.generation_start = time.perf_counter()
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    # Use as: with profiler.phase("vision"): ...
+    def phase(self, name):
+        return PhaseTimer(self, name)
+
+    # Builds the generation's record, sends it to every callback, then starts the next generation
+    def end_generation(self, gen, agents):
+        wall = time.perf_counter() - self.generation_start
+
+        scores = np.array([agent.score for agent in agents])
+        lengths = np.array([agent.steps for agent in agents])
+        steps = int(lengths.sum())
+
+        record = {
+            "generation": gen,
+            "wall_seconds": wall,
+            "phases": {name: {"seconds": t[0], "calls": t[1]} for name, t in self.phases.items()},
+            "steps": steps,
+            "steps_per_sec": steps / wall if wall > 0 else 0.0,
+            "score_min": scores.min().item(),
+            "score_mean": float(scores.mean()),
+            "score_max": scores.max().item(),
+            "episode_length_mean": float(lengths.mean())
+        }
+
+        for callback in self.callbacks:
+            callback(record)
+
+        self.phases = {}
+        self.generation_start = time.perf_counter()
+
+        return record
+
+# Same interface as Profiler, but does nothing so it's close to free when profiling is off
+class NullProfiler:
+    def __init__(self):
+        self.context = nullcontext()
+
+    def phase(self, name):
+        return self.context
+
+    def end_generation(self, gen, agents):
+        return None
+
+# Callback that appends each record to a JSON lines file
+class JsonlWriter:
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, record):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+# Callback that appends each record to a CSV file, phases become <phase>_seconds/<phase>_calls columns
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.fields = None
+
+    def flatten(self, record):
+        row = {key: value for key, value in record.items() if key != "phases"}
+        for name, totals in record["phases"].items():
+            row[f"{name}_seconds"] = totals["seconds"]
+            row[f"{name}_calls"] = totals["calls"]
+
+        return row
+
+    def __call__(self, record):
+        row = self.flatten(record)
+
+        # Columns are fixed by the first record, phases that show up later are dropped
+        new_file = self.fields is None
+        if new_file:
+            self.fields = list(row.keys())
+
+        with open(self.path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.fields, extrasaction="ignore")
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
@@ -0,0 +1,257 @@
+import io
+import multiprocessing as mp
+import queue
+import socket
+import struct
+import threading
+import time
+import traceback
+
+import numpy as np
+from snakeenv import BatchedSnakeEnv
+from snakeagent import SnakeAgent
+from neuralnetwork import PopulationNetwork
+from geneticalgorithm import repopulate_into, make_selection
+from weightstore import WeightStore
+from instrumentation import NullProfiler
+from scheduler import GenerationScheduler
+from gameplay import play_batched
+from seeding import network_rngs, ga_rng
+# Island model: independent populations in separate processes that swap their best genomes every few generations
+
+# Default transport, multiprocessing queues between islands on the same machine
+class QueueTransport:
+    def __init__(self, inbox, outbox):
+        self.inbox = inbox
+        self.outbox = outbox
+
+    def start(self):
+        pass
+
+    def send(self, genomes):
+        self.outbox.put(genomes)
+
+    # Returns None if nothing arrives in time
+    def receive(self, timeout):
+        try:
+            return self.inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+# Sends genomes over TCP, so islands can live on other machines (or on localhost ports)
+class SocketTransport:
+    def __init__(self, listen_address, peer_address):
+        self.listen_address = listen_address
+        self.peer_address = peer_address
+
+        self.server = None
+        self.sender = None
+
+        # Set by the sender thread when a send gives up, raised in the island's own thread
+        self.error = None
+
+    # Opens the listening socket, called inside the island's own process
+    def start(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(self.listen_address)
+        self.server.listen()
+
+    # Arrays are sent with np.save (no pickle), prefixed with their length
+    def encode(self, genomes):
+        buffer = io.BytesIO()
+        np.save(buffer, genomes, allow_pickle=False)
+        data = buffer.getvalue()
+
+        return struct.pack("<Q", len(data)) + data
+
+    def read_exactly(self, connection, size):
+        data = b""
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Error: Connection closed mid message.")
+            data += chunk
+
+        return data
+
+    def send_now(self, data):
+        # The peer might not be listening yet, keep trying for a while
+        for _ in range(100):
+            try:
+                with socket.create_connection(self.peer_address, timeout=10) as connection:
+                    connection.sendall(data)
+                return
+            except OSError as e:
+                error = e
+                time.sleep(0.1)
+
+        self.error = ConnectionError(f"Error: Couldn't reach island at {self.peer_address} ({error}).")
+
+    # Raises a failed send, so the island stops instead of its peer waiting on migrants that never come
+    def check_sender(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    # Sends from a background thread so every island can send before anyone receives
+    def send(self, genomes):
+        if self.sender is not None:
+            self.sender.join()
+
+        self.check_sender()
+
+        self.sender = threading.Thread(target=self.send_now, args=(self.encode(genomes),), daemon=True)
+        self.sender.start()
+
+    def receive(self, timeout):
+        # Wait in short slices so a failed send shows up here instead of after the whole timeout
+        deadline = time.monotonic() + timeout
+        self.server.settimeout(min(timeout, 1))
+
+        while(True):
+            self.check_sender()
+
+            try:
+                connection, _ = self.server.accept()
+                break
+            except socket.timeout:
+                if time.monotonic() >= deadline:
+                    return None
+
+        with connection:
+            connection.settimeout(timeout)
+            size = struct.unpack("<Q", self.read_exactly(connection, 8))[0]
+            data = self.read_exactly(connection, size)
+
+        return np.load(io.BytesIO(data), allow_pickle=False)
+
+    def close(self):
+        if self.sender is not None:
+            self.sender.join()
+
+        if self.server is not None:
+            self.server.close()
+
+        # The last migration's send may have failed after the island was done with the transport
+        self.check_sender()
+
+# Migrants are taken from the evaluated survivors and replace the newest offspring
+def check_migrants(num_agents, num_offspring, migrants):
+    if migrants > num_offspring:
+        raise ValueError("Error: Can't take in more migrants than there are offspring.")
+
+    if migrants > num_agents - num_offspring:
+        raise ValueError("Error: Can't send more migrants than there are survivors.")
+
+# Runs one island, can also be started by hand on another machine with a SocketTransport
+def run_island(index, transport, num_agents, num_generations, num_offspring, env_dimensions, migration_interval, migrants, seed, timeout=60, selection="fitness_softmax"):
+    check_migrants(num_agents, num_offspring, migrants)
+
+    transport.start()
+
+    # Each island gets its own random streams
+    rng = ga_rng(seed)
+    agents = [SnakeAgent(rng=agent_rng) for agent_rng in network_rngs(seed, num_agents)]
+    store = WeightStore(num_agents, agents[0].brain.neurons)
+    store.bind(agents)
+
+    env = BatchedSnakeEnv(num_agents, dimensions=env_dimensions)
+    network = PopulationNetwork([agent.brain for agent in agents], store)
+    profiler = NullProfiler()
+    scheduler = GenerationScheduler()
+
+    best_score = -1
+    best_weights = None
+
+    try:
+        for gen in range(num_generations):
+            play_batched(agents, env, network, None, None, gen, env_dimensions, profiler, scheduler, seed)
+
+            best_index = int(np.argmax([agent.score for agent in agents]))
+            if agents[best_index].score > best_score:
+                best_score = agents[best_index].score
+                best_weights = store.flat[best_index].copy()
+
+            # Same selection, crossover, and mutation as a single population
+            repopulate_into(agents, num_offspring, store, make_selection(selection), rng)
+
+            # Survivors sit at the front sorted by score, so the top migrants are the first rows
+            if migrants > 0 and (gen + 1) % migration_interval == 0:
+                transport.send(store.flat[:migrants].copy())
+
+                # Immigrants replace the newest offspring
+                immigrants = transport.receive(timeout)
+                if immigrants is not None:
+                    store.flat[-len(immigrants):] = immigrants
+    finally:
+        transport.close()
+
+    return index, best_score, best_weights
+
+# Failures are sent back as (index, None, traceback) so the parent doesn't wait on a result that never comes
+def island_process(results, index, *args):
+    try:
+        results.put(run_island(index, *args))
+    except Exception:
+        results.put((index, None, traceback.format_exc()))
+
+# Runs num_islands populations in a ring, island i sends to island i + 1
+def run_islands(num_islands, num_agents, num_generations, num_offspring, env_dimensions, migration_interval=10, migrants=5, transport="queue", host="127.0.0.1", base_port=50000, seed=None, selection="fitness_softmax"):
+    if num_islands <= 0:
+        raise ValueError("Error: Number of islands must be at least 1.")
+
+    # Bad arguments fail here instead of in every island
+    check_migrants(num_agents, num_offspring, migrants)
+
+    # Independent seeds for every island from one root
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(num_islands)]
+
+    if transport == "queue":
+        inboxes = [mp.Queue() for _ in range(num_islands)]
+        transports = [QueueTransport(inboxes[i], inboxes[(i + 1) % num_islands]) for i in range(num_islands)]
+    elif transport == "socket":
+        addresses = [(host, base_port + i) for i in range(num_islands)]
+        transports = [SocketTransport(addresses[i], addresses[(i + 1) % num_islands]) for i in range(num_islands)]
+    else:
+        raise ValueError("Error: Transport must be queue or socket.")
+
+    results = mp.Queue()
+    processes = []
+    for i in range(num_islands):
+        args = (results, i, transports[i], num_agents, num_generations, num_offspring, env_dimensions, migration_interval, migrants, seeds[i], 60, selection)
+        process = mp.Process(target=island_process, args=args)
+        process.start()
+        processes.append(process)
+
+    # Collect before joining so a full results queue can't block the islands
+    outcomes = []
+    try:
+        while len(outcomes) < num_islands:
+            try:
+                outcome = results.get(timeout=1)
+            except queue.Empty:
+                # An island that died without reporting (killed, out of memory) will never send anything
+                for i, process in enumerate(processes):
+                    if process.exitcode is not None and process.exitcode != 0:
+                        raise RuntimeError(f"Error: Island {i} exited with code {process.exitcode}.")
+                continue
+
+            index, best_score, best_weights = outcome
+            if best_score is None:
+                raise RuntimeError(f"Error: Island {index} failed.\n{best_weights}")
+
+            outcomes.append(outcome)
+    finally:
+        # Don't leave the other islands waiting on a neighbour that's gone
+        if len(outcomes) < num_islands:
+            for process in processes:
+                process.terminate()
+
+        for process in processes:
+            process.join()
+
+    return sorted(outcomes, key=lambda outcome: outcome[0])
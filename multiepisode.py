@@ -0,0 +1,203 @@
+import numpy as np
+from snakeenv import BatchedSnakeEnv, winning_score
+from neuralnetwork import PopulationNetwork
+from vision import deconstruct_batch
+from geneticalgorithm import fitness_values
+from seeding import root_seed, child_seed, EPISODE_STREAM
+# Fitness from several seeded episodes per agent, with optional racing to drop clearly worse agents early
+
+# Plays one episode for every network at once, food spawns only depend on seed
+def play_episodes(networks, env_dimensions, max_food, seed):
+    # Every game gets the same food stream, so an agent's result doesn't depend on who it's batched with
+    env = BatchedSnakeEnv(len(networks), env_dimensions, max_food, [np.random.default_rng(seed) for _ in networks])
+    network = PopulationNetwork(networks)
+    env.reset()
+
+    max_score = winning_score(env_dimensions)
+
+    while(env.alive.any()):
+        inputs = deconstruct_batch(env, network.compute_dtype)
+        env.step(network.predict_actions(inputs, env.alive))
+
+        # Someone beat the game
+        if (env.score == max_score).any():
+            break
+
+    return env.score.copy(), env.steps.copy(), env.steps_without_food.copy()
+
+# Mean minus a confidence margin, agents with one episode get no margin
+def confidence_bounds(values, confidence):
+    values = np.asarray(values, dtype=float)
+    mean = values.mean()
+
+    if len(values) < 2:
+        return mean, mean
+
+    margin = confidence * values.std(ddof=1) / np.sqrt(len(values))
+
+    return mean - margin, mean + margin
+
+class MultiEpisodeEvaluator:
+    def __init__(self, env_dimensions, episodes=5, aggregate="mean", racing=False, top_k=None, min_episodes=2, confidence=1.96, max_food=1, seed=None, fixed_seeds=False, cache=None, refresh_episodes=0):
+        # Bounds checking
+        if episodes <= 0:
+            raise ValueError("Error: Number of episodes must be at least 1.")
+
+        if aggregate not in ["mean", "median", "lcb"]:
+            raise ValueError("Error: Aggregate must be mean, median, or lcb.")
+
+        if racing and top_k is None:
+            raise ValueError("Error: Racing needs top_k (how many agents survive each generation).")
+
+        self.env_dimensions = env_dimensions
+        self.max_food = max_food
+        self.episodes = episodes
+        self.aggregate = aggregate
+
+        # Racing stops playing agents whose upper bound can't reach the k-th best lower bound
+        self.racing = racing
+        self.top_k = top_k
+        self.min_episodes = max(min_episodes, 1)
+        self.confidence = confidence
+
+        # Episode e of generation g uses the same seed for every agent, taken from the run's root seed unless seed is given
+        self.seed = seed
+        self.root_seed = None if seed is None else root_seed(seed)
+
+        # With fixed seeds every generation replays the same K episodes, so cached results are exact
+        self.fixed_seeds = fixed_seeds
+
+        # Optional FitnessCache, genomes seen before only play episodes they don't have yet
+        self.cache = cache
+
+        # Without fixed seeds, how many new episodes a cached genome still plays each generation
+        self.refresh_episodes = refresh_episodes
+
+    # evaluate calls this with its root seed, so the same run seed gives the same episodes
+    def use_run_seed(self, root):
+        if self.seed is None:
+            self.root_seed = root
+
+    def episode_seed(self, gen, episode):
+        # Not part of a run and no seed given
+        if self.root_seed is None:
+            self.root_seed = root_seed()
+
+        if self.fixed_seeds:
+            return int(child_seed(self.root_seed, EPISODE_STREAM, episode).generate_state(1)[0])
+
+        return int(child_seed(self.root_seed, EPISODE_STREAM, gen, episode).generate_state(1)[0])
+
+    # Everything that changes an agent's results besides its weights
+    def config(self):
+        return (list(self.env_dimensions), self.max_food, self.root_seed, self.fixed_seeds)
+
+    # Which of this generation's episodes an agent with this (possibly cached) entry still needs
+    def pending_episodes(self, entry, seeds):
+        if self.fixed_seeds:
+            return {e for e, seed in enumerate(seeds) if seed not in entry["seeds"]}
+
+        if len(entry["seeds"]) >= self.episodes:
+            return set(range(min(self.refresh_episodes, self.episodes)))
+
+        return set(range(self.episodes - len(entry["seeds"])))
+
+    # Combines one agent's episode fitnesses into a single value
+    def combine(self, values):
+        if self.aggregate == "mean":
+            return float(np.mean(values))
+        elif self.aggregate == "median":
+            return float(np.median(values))
+        else:
+            return float(confidence_bounds(values, self.confidence)[0])
+
+    # Agents in racing that still have a chance to make the top k
+    def race(self, racing, fitnesses):
+        bounds = [confidence_bounds(values, self.confidence) for values in fitnesses]
+        lower = np.array([bound[0] for bound in bounds])
+        upper = np.array([bound[1] for bound in bounds])
+
+        if len(lower) <= self.top_k:
+            return racing
+
+        # k-th best lower bound over every agent, including ones already dropped
+        threshold = np.sort(lower)[-self.top_k]
+
+        return racing[upper[racing] >= threshold]
+
+    # Plays one generation, returns the agent that beat the game if there is one
+    def play(self, agents, gen):
+        seeds = [self.episode_seed(gen, e) for e in range(self.episodes)]
+
+        # Identical genomes (survivors, clones) share one entry and are only played once
+        keys = []
+        entries = {}
+        for agent in agents:
+            if self.cache is not None:
+                key = self.cache.key(agent.brain.layers, self.config())
+            else:
+                key = id(agent)
+            keys.append(key)
+
+            if key not in entries:
+                entry = self.cache.get(key) if self.cache is not None else None
+                if entry is None:
+                    entry = {"seeds": [], "scores": [], "steps": [], "steps_without_food": [], "fitnesses": []}
+                else:
+                    entry = {name: list(values) for name, values in entry.items()}
+
+                entries[key] = entry
+
+        unique = list(entries.keys())
+        brains = {key: agents[keys.index(key)].brain for key in unique}
+        pending = [self.pending_episodes(entries[key], seeds) for key in unique]
+
+        max_score = winning_score(self.env_dimensions)
+        racing = np.arange(len(unique))
+        winner_key = None
+
+        for episode in range(self.episodes):
+            players = [u for u in racing if episode in pending[u]]
+
+            if players:
+                networks = [brains[unique[u]] for u in players]
+                results = play_episodes(networks, self.env_dimensions, self.max_food, seeds[episode])
+                values = fitness_values(*results)
+
+                for j, u in enumerate(players):
+                    entry = entries[unique[u]]
+                    entry["seeds"].append(seeds[episode])
+                    entry["scores"].append(int(results[0][j]))
+                    entry["steps"].append(int(results[1][j]))
+                    entry["steps_without_food"].append(int(results[2][j]))
+                    entry["fitnesses"].append(float(values[j]))
+
+                    if results[0][j] == max_score and winner_key is None:
+                        winner_key = unique[u]
+
+            if winner_key is not None:
+                break
+
+            if self.racing and episode + 1 >= self.min_episodes:
+                racing = self.race(racing, [entries[key]["fitnesses"] for key in unique])
+
+        if self.cache is not None:
+            for key in unique:
+                self.cache.put(key, entries[key])
+
+        # Averages for display/culling, the aggregated fitness is what selection uses
+        winner = None
+        for agent, key in zip(agents, keys):
+            entry = entries[key]
+
+            agent.score = float(np.mean(entry["scores"]))
+            agent.steps = float(np.mean(entry["steps"]))
+            agent.steps_without_food = float(np.mean(entry["steps_without_food"]))
+            agent.alive = False
+            agent.episodes = len(entry["fitnesses"])
+            agent.fitness = self.combine(entry["fitnesses"])
+
+            if key == winner_key and winner is None:
+                winner = agent
+
+        return winner
@@ -1,8 +1,13 @@
 import numpy as np
 
+# float16 is only used for storing weights, the math is done in float32
+def compute_dtype(dtype):
+    dtype = np.dtype(dtype)
+    return np.dtype(np.float32) if dtype == np.float16 else dtype
+
 # The 'brain' of each snake
 class NeuralNetwork:
-    def __init__(self, num_layers, neurons, activations):
+    def __init__(self, num_layers, neurons, activations, dtype=np.float64, rng=None):
         # Make sure the parameters match properly
         assert num_layers == len(neurons) == (len(activations) + 1)
 
@@ -10,7 +15,20 @@ class NeuralNetwork:
         self.neurons = neurons
         self.activations = self.map_activations(activations)
 
-        self.init_network()
+        # Weights are stored as dtype and computed with compute_dtype
+        self.dtype = np.dtype(dtype)
+        self.compute_dtype = compute_dtype(dtype)
+
+        self.build_pipeline()
+        self.init_network(rng)
+
+    # Brains pickled before dtypes existed are float64
+    def __setstate__(self, state):
+        state.setdefault("dtype", np.dtype(np.float64))
+        state.setdefault("compute_dtype", np.dtype(np.float64))
+        self.__dict__.update(state)
+
+        self.build_pipeline()
 
     # Helper function to map strings to activation functions
     def map_activations(self, activations):
@@ -23,6 +41,16 @@ class NeuralNetwork:
 
         return funcs
 
+    # Works out once what each layer needs, so predict doesn't dispatch through a method per layer
+    def build_pipeline(self):
+        names = [func.__name__ for func in self.activations]
+
+        # Hidden relu layers are done in place
+        self.relu_layers = [name == "relu" for name in names[:-1]]
+
+        # Softmax keeps the order of the scores, so picking an action can skip it
+        self.output_is_softmax = names[-1] == "softmax"
+
     # Hidden layer(s) activation function
     def relu(self, input):
         return np.maximum(0, input)
@@ -32,24 +60,147 @@ class NeuralNetwork:
         stabilized = np.exp(scores - np.max(scores))
         return stabilized / np.sum(stabilized) 
     
-    def fire_neurons(self, inputs, weights, activation):
-        return activation(inputs @ weights)
-    
-    def init_network(self):
+    # Takes its own Generator so weights don't depend on anything else drawn before them
+    def init_network(self, rng=None):
+        rng = np.random.default_rng(rng)
         self.layers = []
 
-        # Randomly initialize neuron weights for each layer
+        # Randomly initialize neuron weights for each layer (drawn as float64 so every dtype starts from the same weights)
         for i in range(self.num_layers - 1):
-            neurons = np.random.normal(0, 1, (self.neurons[i], self.neurons[i + 1]))
+            neurons = rng.standard_normal((self.neurons[i], self.neurons[i + 1])).astype(self.dtype)
 
             self.layers.append(neurons)
 
+    # Forward pass without the output activation
+    def logits(self, inputs):
+        values = np.asarray(inputs, dtype=self.compute_dtype)
+        last = len(self.layers) - 1
+
+        for i in range(last):
+            # Multiply inputs with neuron weights and use activation function to get outputs
+            values = values @ self.layers[i].astype(self.compute_dtype, copy=False)
+
+            if self.relu_layers[i]:
+                np.maximum(values, 0, out=values)
+            else:
+                values = self.activations[i](values)
+
+        return values @ self.layers[last].astype(self.compute_dtype, copy=False)
+
+    # Full output probabilities
     def predict(self, inputs):
-        values = inputs
+        return self.activations[-1](self.logits(inputs))
 
-        # Forward pass
+    # Inference fast path, only the index of the best output
+    def predict_action(self, inputs):
+        scores = self.logits(inputs)
+
+        if not self.output_is_softmax:
+            scores = self.activations[-1](scores)
+
+        return np.argmax(scores)
+
+# Runs the forward pass for a whole population of same-shaped networks at once
+class PopulationNetwork:
+    def __init__(self, networks, store=None):
+        self.networks = networks
+
+        # If the weights live in a WeightStore its layer views are used directly
+        self.store = store
+
+        first = networks[0]
+        self.num_layers = first.num_layers
+        self.neurons = first.neurons
+        self.dtype = first.dtype
+        self.compute_dtype = first.compute_dtype
+        self.activations = self.map_activations([func.__name__ for func in first.activations])
+        self.relu_layers = first.relu_layers
+        self.output_is_softmax = first.output_is_softmax
+
+        self.load()
+
+    # Helper function to map activation names to their batched versions
+    def map_activations(self, activations):
+        funcs = []
+        for function in activations:
+            if function == "relu":
+                funcs.append(self.relu)
+            else:
+                funcs.append(self.softmax)
+
+        return funcs
+
+    def relu(self, input):
+        return np.maximum(0, input)
+
+    # Softmax over each agent's outputs separately
+    def softmax(self, scores):
+        stabilized = np.exp(scores - np.max(scores, axis=1, keepdims=True))
+        return stabilized / np.sum(stabilized, axis=1, keepdims=True)
+
+    # Stacks every network's weights into (agents, inputs, outputs) tensors, call again after weights change
+    def load(self):
+        if self.store is not None:
+            layers = self.store.layers
+        else:
+            layers = []
+            for i in range(self.num_layers - 1):
+                layers.append(np.stack([network.layers[i] for network in self.networks]))
+
+        # float16 weights are widened once here instead of on every step (no copy otherwise)
+        self.layers = [layer.astype(self.compute_dtype, copy=False) for layer in layers]
+
+    # Forward pass without the output activation, for the live agents only (active is None when all are alive)
+    def logits(self, inputs, alive=None):
+        inputs = np.asarray(inputs, dtype=self.compute_dtype)
+
+        if alive is None or alive.all():
+            active = None
+            values = inputs
+        else:
+            active = np.flatnonzero(alive)
+            values = inputs[active]
+
+        # Forward pass, one batched matmul per layer
+        last = len(self.layers) - 1
         for i in range(len(self.layers)):
-            # Multiply inputs with neuron weights and use activation function to get outputs
-            values = self.fire_neurons(values, self.layers[i], self.activations[i])
+            weights = self.layers[i] if active is None else self.layers[i][active]
+            values = np.matmul(values[:, None, :], weights)[:, 0]
+
+            if i == last:
+                break
+
+            if self.relu_layers[i]:
+                np.maximum(values, 0, out=values)
+            else:
+                values = self.activations[i](values)
+
+        return values, active
+
+    # Full output probabilities, dead agents get all zero outputs
+    def predict(self, inputs, alive=None):
+        values, active = self.logits(inputs, alive)
+        values = self.activations[-1](values)
+
+        if active is None:
+            return values
+
+        outputs = np.zeros((len(inputs), values.shape[1]), dtype=values.dtype)
+        outputs[active] = values
+
+        return outputs
+
+    # Inference fast path, the best output index for each agent (0 for dead agents)
+    def predict_actions(self, inputs, alive=None):
+        values, active = self.logits(inputs, alive)
+
+        if not self.output_is_softmax:
+            values = self.activations[-1](values)
+
+        if active is None:
+            return np.argmax(values, axis=1)
+
+        actions = np.zeros(len(inputs), dtype=np.intp)
+        actions[active] = np.argmax(values, axis=1)
 
-        return values
\ No newline at end of file
+        return actions
@@ -0,0 +1,124 @@
+import multiprocessing as mp
+import numpy as np
+from snakeenv import SnakeEnv, winning_score
+from snakeagent import SnakeAgent
+from weightstore import WeightStore
+from seeding import root_seed, env_rng
+# Plays a generation across a pool of worker processes
+
+# Each worker keeps one agent and one environment around for its whole life
+worker_agent = None
+worker_env = None
+worker_store = None
+
+def init_worker(env_dimensions, max_food, dtype, store_info):
+    global worker_agent, worker_env, worker_store
+
+    worker_agent = SnakeAgent(dtype=dtype)
+    worker_env = SnakeEnv(env_dimensions, max_food)
+
+    # Attach to the shared population weights if there are any
+    if store_info is not None:
+        name, num_agents, neurons, dtype = store_info
+        worker_store = WeightStore(num_agents, neurons, dtype, name=name)
+
+# Plays one episode for the current worker agent
+def play_episode(rng):
+    agent = worker_agent
+    env = worker_env
+
+    # Food spawns only depend on this Generator, not on whatever the worker played before
+    env.reset(rng)
+    agent.score = 0
+    agent.alive = True
+    agent.steps = 0
+    agent.steps_without_food = 0
+
+    max_score = winning_score(env.dimensions)
+
+    while(agent.alive):
+        action = agent.take_action(env)
+
+        # Update agent's info
+        agent.alive = env.step(action)
+        agent.score = env.score
+        agent.steps_without_food = env.steps_without_food
+
+        # Agent beat the game
+        if agent.score == max_score:
+            break
+
+    return agent.score, agent.steps, agent.steps_without_food
+
+# Worker task: plays every agent in a shard, only weights (or nothing, with a shared store) go over the pipe
+def play_shard(task):
+    indices, weights, gen, root = task
+
+    results = []
+    for i, index in enumerate(indices):
+        if weights is None:
+            worker_agent.set_weights(worker_store.agent_layers(index))
+        else:
+            worker_agent.set_weights(weights[i])
+
+        # Same stream the agent's game gets in serial or batched play
+        results.append(play_episode(env_rng(root, gen, index)))
+
+    return results
+
+class ParallelEvaluator:
+    def __init__(self, workers, env_dimensions, max_food=1, seed=None, store=None, dtype=np.float64):
+        if workers <= 0:
+            raise ValueError("Error: Number of workers must be at least 1.")
+
+        self.workers = workers
+        self.env_dimensions = env_dimensions
+
+        # Same seed gives the same results no matter how many workers there are
+        self.root_seed = root_seed(seed)
+
+        # Workers read weights out of shared memory instead of having them pickled each generation
+        self.store = store
+        store_info = None
+        if store is not None and store.name is not None:
+            store_info = (store.name, store.num_agents, store.neurons, store.dtype.str)
+
+        # Workers stay alive across generations
+        self.pool = mp.Pool(workers, initializer=init_worker, initargs=(env_dimensions, max_food, np.dtype(dtype).str, store_info))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    # Plays one generation, returns the agent that beat the game if there is one
+    def play(self, agents, gen):
+        # A few shards per worker keeps them busy when some episodes run long
+        shards = np.array_split(np.arange(len(agents)), min(len(agents), self.workers * 4))
+
+        tasks = []
+        for shard in shards:
+            if self.store is not None and self.store.name is not None:
+                weights = None
+            else:
+                weights = [agents[i].brain.layers for i in shard]
+
+            tasks.append((shard.tolist(), weights, gen, self.root_seed))
+
+        results = self.pool.map(play_shard, tasks)
+
+        # Copy results back for repopulate
+        max_score = winning_score(self.env_dimensions)
+        winner = None
+
+        for shard, shard_results in zip(shards, results):
+            for i, (score, steps, steps_without_food) in zip(shard, shard_results):
+                agent = agents[i]
+                agent.score = score
+                agent.alive = False
+                agent.steps = steps
+                agent.steps_without_food = steps_without_food
+
+                if score == max_score and winner is None:
+                    winner = agent
+
+        return winner
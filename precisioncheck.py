@@ -0,0 +1,84 @@
+import argparse
+import pickle
+
+import numpy as np
+
+from snakeenv import SnakeEnv
+from snakeagent import SnakeAgent
+from neuralnetwork import NeuralNetwork
+from vision import vision_inputs
+from weightformat import WeightArchive
+
+# Reports how often reduced precision networks pick a different action than the float64 reference
+# Run: python precisioncheck.py [--brain brain.snkw] [--episodes 20]
+
+# Copy of a network with its weights stored as dtype
+def with_dtype(network, dtype):
+    names = [func.__name__ for func in network.activations]
+    copy = NeuralNetwork(network.num_layers, network.neurons, names, dtype)
+    copy.layers = [layer.astype(dtype) for layer in network.layers]
+
+    return copy
+
+# Plays episodes with the float64 network in control and counts disagreements per dtype
+def compare_actions(network, dimensions, episodes, dtypes, rng=None):
+    reference = with_dtype(network, np.float64)
+    reduced = {np.dtype(dtype).name: with_dtype(network, dtype) for dtype in dtypes}
+
+    env = SnakeEnv(dimensions, rng=rng)
+    steps = 0
+    mismatches = {name: 0 for name in reduced}
+
+    for _ in range(episodes):
+        env.reset()
+
+        alive = True
+        while(alive):
+            inputs = vision_inputs(env.grid, env.head_pos, env.previous_direction, env.food_positions[0])
+            action = reference.predict_action(inputs)
+
+            for name, candidate in reduced.items():
+                if candidate.predict_action(inputs) != action:
+                    mismatches[name] += 1
+
+            steps += 1
+            alive = env.step(action)
+
+    return steps, mismatches
+
+def load_networks(path):
+    if path.endswith(".pkl"):
+        with open(path, "rb") as f:
+            return [pickle.load(f)]
+
+    archive = WeightArchive(path)
+    return [archive.network(i) for i in range(len(archive))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare reduced precision actions against float64.")
+    parser.add_argument("--brain", default=None, help="brain.pkl or a .snkw file (every network in it is checked)")
+    parser.add_argument("--agents", type=int, default=20, help="Random agents to check when no brain is given")
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--dimensions", type=int, nargs=2, default=[15, 15])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    if args.brain is not None:
+        networks = load_networks(args.brain)
+    else:
+        networks = [SnakeAgent(rng=rng).brain for _ in range(args.agents)]
+
+    total_steps = 0
+    total_mismatches = {}
+    for network in networks:
+        steps, mismatches = compare_actions(network, args.dimensions, args.episodes, [np.float32, np.float16], rng)
+
+        total_steps += steps
+        for name, count in mismatches.items():
+            total_mismatches[name] = total_mismatches.get(name, 0) + count
+
+    print(f"Checked {len(networks)} networks over {total_steps} steps")
+    for name, count in total_mismatches.items():
+        print(f"{name}: {count} different actions ({count / max(total_steps, 1):.4%})")
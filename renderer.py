@@ -12,6 +12,15 @@ TODO: Fix window size
 
 # A helper class which renders the game environment
 class Renderer:
+    # Colors for grid objects
+    colors = {
+        0: (220, 220, 220), # Empty = light gray
+        1: (42, 165, 8), # Snake head = dark green
+        2: (59, 226, 13), # Snake body = light green
+        3: (226, 20, 13), # Food = red
+        4: (40, 40, 40) # Wall = dark grey
+    }
+
     def __init__(self, render_mode=None, render_fps=5):
         # Rendering with pygame
         self.screen = None
@@ -21,12 +30,23 @@ class Renderer:
 
         self.last_action = 0
 
+        # Cached grid line overlay
+        self.grid_lines_key = None
+        self.grid_lines_surface = None
+
+        # Cached background, and what render_frame last drew over it
+        self.background_key = None
+        self.background = None
+        self.frame_grid = None
+        self.frame_header = None
+        self.dirty_rects = []
+
     def close(self): 
         # Shutdown pygame properly
         if self.screen != None:
             pygame.quit()
 
-    def render_frame(self, grid, score, generation):
+    def init_screen(self):
         # Initialize screen on first render call
         if self.screen == None: 
             # Start pygame
@@ -44,51 +64,94 @@ class Renderer:
             # Set font for score
             self.font = pygame.font.SysFont(None, 28)
 
-        # Get grid dimensions
-        self.size = grid.shape
+    # Header with the score info, drawn over the background's header area
+    def draw_header(self, score_label, score, generation):
+        self.screen.blit(self.background, (0, 0), pygame.Rect(0, 0, self.screen.get_width(), 50))
+
+        score_text = self.font.render(f"{score_label}: {score}", True, (0, 0, 0))
+        generation_text = self.font.render(f"GENERATION: {generation}", True, (0, 0, 0))
+        self.screen.blit(score_text, (10, 10))
+        self.screen.blit(generation_text, (200, 10))
+
+        return pygame.Rect(0, 0, self.screen.get_width(), 50)
+
+    # Draws one grid square with its grid line, returns the area that changed
+    def draw_cell(self, row, col, value, cell_size):
+        # Draw each grid square to fit inside screen
+        rect = pygame.Rect( 
+            col * cell_size,
+            row * cell_size + 50, # Moved down for score
+            cell_size,
+            cell_size
+        )
+
+        pygame.draw.rect(self.screen, self.colors[value], rect)
+        pygame.draw.rect(self.screen, (0, 0, 0), rect, 1) # Grid lines
+
+        return rect
+
+    # Walls, empty squares, grid lines and the blank header, made once per board size
+    def build_background(self, grid, cell_size):
+        key = (grid.shape, cell_size)
+        if self.background_key == key:
+            return
+
+        background = pygame.Surface(self.screen.get_size())
 
         # Clear screen (white background)
-        self.screen.fill((255, 255, 255))
+        background.fill((255, 255, 255))
 
         # Score info
         pygame.draw.rect(
-            self.screen,
+            background,
             (200, 200, 200),
-            pygame.Rect(0, 0, self.screen.get_width(), 50)
+            pygame.Rect(0, 0, background.get_width(), 50)
         )
 
-        score_text = self.font.render(f"SCORE: {score}", True, (0, 0, 0))
-        generation_text = self.font.render(f"GENERATION: {generation}", True, (0, 0, 0))
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(generation_text, (200, 10))
+        # Draw the static grid, walls are the same for every board of this size
+        for row in range(grid.shape[0]):
+            for col in range(grid.shape[1]):
+                value = 4 if grid[row, col] == 4 else 0
+                rect = pygame.Rect(col * cell_size, row * cell_size + 50, cell_size, cell_size)
 
-        # Colors for grid objects
-        colors = {
-            0: (220, 220, 220), # Empty = light gray
-            1: (42, 165, 8), # Snake head = dark green
-            2: (59, 226, 13), # Snake body = light green
-            3: (226, 20, 13), # Food = red
-            4: (40, 40, 40) # Wall = dark grey
-        }
+                pygame.draw.rect(background, self.colors[value], rect)
+                pygame.draw.rect(background, (0, 0, 0), rect, 1)
 
-        cell_size = min(800 // self.size[1], 800 // self.size[0])
+        self.background_key = key
+        self.background = background
+
+        # Whatever was on screen before no longer matches
+        self.frame_grid = None
+
+    def render_frame(self, grid, score, generation):
+        self.init_screen()
 
-        # Draw the grid state
-        for row in range(self.size[0]):
-            for col in range(self.size[1]):
-                value = grid[row, col]
-                color = colors[value]
-
-                # Draw each grid square to fit inside screen
-                rect = pygame.Rect( 
-                    col * cell_size,
-                    row * cell_size + 50, # Moved down for score
-                    cell_size,
-                    cell_size
-                )
-
-                pygame.draw.rect(self.screen, color, rect)
-                pygame.draw.rect(self.screen, (0, 0, 0), rect, 1) # Grid lines
+        # Get grid dimensions
+        self.size = grid.shape
+
+        cell_size = min(800 // self.size[1], 800 // self.size[0])
+        self.build_background(grid, cell_size)
+
+        if self.frame_grid is None or self.frame_grid.shape != grid.shape:
+            # Start from the background and draw everything that isn't part of it
+            self.screen.blit(self.background, (0, 0))
+            changed = np.argwhere((grid != 0) & (grid != 4))
+            self.dirty_rects = [self.screen.get_rect()]
+        else:
+            # Only squares that changed since the last frame
+            changed = np.argwhere(grid != self.frame_grid)
+            self.dirty_rects = []
+
+        for row, col in changed:
+            self.dirty_rects.append(self.draw_cell(row, col, grid[row, col], cell_size))
+
+        # Text is only redrawn when it changes
+        header = (score, generation)
+        if self.frame_header != header or self.frame_grid is None:
+            self.dirty_rects.append(self.draw_header("SCORE", score, generation))
+            self.frame_header = header
+
+        self.frame_grid = grid.copy()
         
     def render_single(self, grid, score, generation):
         # TODO: Add label for current agent ID
@@ -99,33 +162,82 @@ class Renderer:
             if event.type == pygame.QUIT:
                 self.close()
             
-        pygame.display.flip()
+        # Only push the parts of the screen that changed
+        pygame.display.update(self.dirty_rects)
 
         # Move game forward
         self.clock.tick(self.render_fps)
 
-    # Renders all agents on the same grid
-    def render_overlay(self, pairs, gen):
-        # Initialize screen on first render call
-        if self.screen == None: 
-            # Start pygame
-            pygame.init() 
+    # Transparent surface with just the grid lines, made once per board/cell size
+    def grid_lines(self, rows, cols, cell_size):
+        key = (rows, cols, cell_size)
+        if self.grid_lines_key != key:
+            surface = pygame.Surface((cols * cell_size, rows * cell_size), pygame.SRCALPHA)
 
-            # Initialize window
-            window_width = 800
-            window_height = 850
-            self.screen = pygame.display.set_mode((window_width, window_height))
-            pygame.display.set_caption(f"Snake - {self.render_mode}")
+            for row in range(rows):
+                for col in range(cols):
+                    rect = pygame.Rect(col * cell_size, row * cell_size, cell_size, cell_size)
+                    pygame.draw.rect(surface, (0, 0, 0), rect, 1)
 
-            # Start clock
-            self.clock = pygame.time.Clock()
+            self.grid_lines_key = key
+            self.grid_lines_surface = surface
 
-            # Set font for score
-            self.font = pygame.font.SysFont(None, 28)
+        return self.grid_lines_surface
+
+    # Builds the overlay heatmap colors for every cell at once, returns a (rows, cols, 3) image
+    def overlay_image(self, grids, alive):
+        grids = np.asarray(grids)
+        alive = np.asarray(alive, dtype=bool)
+
+        # Walls don't change
+        wall_mask = grids[0] == 4
+
+        # Add occurrences to heatmaps, one reduction over every live grid
+        live = grids[alive]
+        num_alive = len(live)
+
+        # Normalize color intensity so any number of agents works
+        if num_alive > 0:
+            snake_map = np.count_nonzero((live == 1) | (live == 2), axis=0).astype(np.float32) / np.float32(num_alive)
+            food_map = np.count_nonzero(live == 3, axis=0).astype(np.float32) / np.float32(num_alive)
+        else:
+            snake_map = np.zeros(wall_mask.shape, dtype=np.float32)
+            food_map = np.zeros(wall_mask.shape, dtype=np.float32)
+
+        # Clip the heatmaps to make sure they're between 0 and 1
+        snake_i = np.clip(snake_map, 0, 1)
+        food_i = np.clip(food_map, 0, 1)
+
+        # Combined color intensity (presence of food, snake, or both)
+        presence = np.maximum(snake_i, food_i)
+        occupied = presence > 0
+
+        # Enforce a minimum color strength (40%) to make it look better
+        min_i = 0.40
+        intensity = min_i + (1.0 - min_i) * presence
+
+        # Mix the colors of the objects on the square
+        total = np.where(occupied, snake_i + food_i, 1)
+        target = np.zeros(wall_mask.shape + (3,), dtype=np.float32)
+        target[..., 0] = np.trunc(255 * (food_i / total))
+        target[..., 1] = np.trunc(255 * (snake_i / total))
+
+        # Blend colors to white by intensity
+        blended = np.clip(np.trunc(255 - (255 - target) * intensity[..., None]), 0, 255)
+
+        # Empty squares = white, walls = dark grey
+        image = np.full(wall_mask.shape + (3,), 255, dtype=np.uint8)
+        image[occupied] = blended[occupied]
+        image[wall_mask] = (40, 40, 40)
+
+        return image
+
+    # Renders all agents on the same grid
+    def render_overlay(self, grids, alive, score, gen):
+        self.init_screen()
 
         # Get grid dimensions using a sample grid, they all have the same dimension
-        sample_env = list(pairs.values())[0]
-        rows, cols = sample_env.grid.shape
+        rows, cols = grids[0].shape
         self.size = (rows, cols)
 
         # Clear screen (white background)
@@ -138,95 +250,23 @@ class Renderer:
             pygame.Rect(0, 0, self.screen.get_width(), 50)
         )
 
-        # Get highest score agent
-        score = max(a.score for a in pairs.keys())
-
         score_text = self.font.render(f"HIGHEST SCORE: {score}", True, (0, 0, 0))
         generation_text = self.font.render(f"GENERATION: {gen}", True, (0, 0, 0))
         self.screen.blit(score_text, (10, 10))
         self.screen.blit(generation_text, (200, 10))
 
-        # Heatmaps
-        snake_map = np.zeros(self.size, dtype=np.float32)
-        food_map = np.zeros(self.size, dtype=np.float32)
-
-        # Walls don't change
-        wall_mask = (sample_env.grid == 4)
-
-        # Add grid values to heatmap
-        alive = 0
-        for agent, env in pairs.items():
-            if not agent.alive:
-                continue
-
-            alive += 1
-            grid = env.grid
+        cell_size = min(800 // self.size[1], 800 // self.size[0])
 
-            # Add occurrences to heatmaps
-            snake_map += (grid == 1) | (grid == 2)
-            food_map += grid == 3
-            
-        # Normalize color intensity so any number of agents works
-        if alive > 0:
-            snake_map /= alive
-            food_map /= alive
+        # One pixel per cell, surfarray wants (width, height) so rows and cols swap
+        image = self.overlay_image(grids, alive)
+        surface = pygame.surfarray.make_surface(image.transpose(1, 0, 2))
 
-        cell_size = min(800 // self.size[1], 800 // self.size[0])
+        # Scale up to the cell size (moved down for score) and put the grid lines on top
+        self.screen.blit(pygame.transform.scale(surface, (cols * cell_size, rows * cell_size)), (0, 50))
+        self.screen.blit(self.grid_lines(rows, cols, cell_size), (0, 50))
 
-        # Draw the grid state
-        for row in range(self.size[0]):
-            for col in range(self.size[1]):
-                if wall_mask[row, col]:
-                    color = (40, 40, 40)
-                else:
-                    # Clip the heatmaps to make sure they're between 0 and 1
-                    snake_i = np.clip(snake_map[row, col], 0, 1)
-                    food_i = np.clip(food_map[row, col], 0, 1)
-
-                    # Combined color intensity (presence of food, snake, or both)
-                    presence = max(snake_i, food_i)
-
-                    if presence == 0:
-                        # Empty squares = white
-                        color = (255, 255, 255)
-                    else:
-                        # Enforce a minimum color strength (40%) to make it look better
-                        min_i = 0.40
-                        
-                        # Color intensity based on how many things in the square
-                        intensity = min_i + (1.0 - min_i) * presence
-
-                        # Mix the colors of the objects on the square
-                        total = snake_i + food_i
-                        red_ratio = food_i / total
-                        green_ratio = snake_i / total
-
-                        target_r = int(255 * red_ratio)
-                        target_g = int(255 * green_ratio)
-                        target_b = 0
-
-                        # Blend colors to white by intensity
-                        r_col = int(255 - (255 - target_r) * intensity)
-                        g_col = int(255 - (255 - target_g) * intensity)
-                        b_col = int(255 - (255 - target_b) * intensity)
-
-                        # Clip to valid range (0 to 255)
-                        r_col = int(np.clip(r_col, 0, 255))
-                        g_col = int(np.clip(g_col, 0, 255))
-                        b_col = int(np.clip(b_col, 0, 255))
-
-                        color = (r_col, g_col, b_col)
-
-                # Draw each grid square to fit inside screen
-                rect = pygame.Rect( 
-                    col * cell_size,
-                    row * cell_size + 50, # Moved down for score
-                    cell_size,
-                    cell_size
-                )
-
-                pygame.draw.rect(self.screen, color, rect)
-                pygame.draw.rect(self.screen, (0, 0, 0), rect, 1) # Grid lines
+        # render_frame has to start over from the background next time
+        self.frame_grid = None
 
         for event in pygame.event.get():
             # Quit early if we click the X
@@ -259,7 +299,7 @@ class Renderer:
 
         alive = env.step(self.last_action)
 
-        pygame.display.flip()
+        pygame.display.update(self.dirty_rects)
 
         # Move game forward
         self.clock.tick(self.render_fps)
@@ -0,0 +1,96 @@
+import sys
+import threading
+
+import numpy as np
+from renderer import Renderer
+# Draws from a background thread so rendering doesn't slow the simulation down to the display frame rate
+# Linux/Windows only, macOS only allows windows and events on the main thread (and aborts otherwise)
+
+# Holds only the newest frame, publishing over a frame that wasn't drawn yet drops it
+class FrameBuffer:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.frame = None
+        self.closed = False
+
+        # How many frames were replaced before they were drawn
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, frame):
+        with self.condition:
+            if self.frame is not None:
+                self.dropped += 1
+
+            self.frame = frame
+            self.published += 1
+            self.condition.notify()
+
+    # Waits for a new frame, returns None once closed
+    def take(self):
+        with self.condition:
+            while self.frame is None and not self.closed:
+                self.condition.wait()
+
+            frame = self.frame
+            self.frame = None
+
+            return frame
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+# Same render calls as Renderer, but they only copy the grids and return right away
+class RenderThread:
+    def __init__(self, render_mode=None, render_fps=30):
+        # Can't be caught once pygame touches the window, so refuse up front
+        if sys.platform == "darwin":
+            raise ValueError("Error: The render thread doesn't work on macOS, pygame windows have to stay on the main thread.")
+
+        self.render_mode = render_mode
+        self.render_fps = render_fps
+        self.buffer = FrameBuffer()
+
+        # The window is created and only ever touched by the render thread
+        self.renderer = None
+        self.thread = threading.Thread(target=self.render_loop, daemon=True)
+        self.thread.start()
+
+    def render_loop(self):
+        # The renderer's clock caps drawing at render_fps, anything published meanwhile is dropped
+        self.renderer = Renderer(self.render_mode, self.render_fps)
+
+        while(True):
+            frame = self.buffer.take()
+            if frame is None:
+                break
+
+            method, args = frame
+            try:
+                getattr(self.renderer, method)(*args)
+            except Exception as e:
+                # Window was closed (or drawing broke), keep training without it
+                print(f"Error rendering, {e}")
+                break
+
+        self.renderer.close()
+
+    # Snapshots are copied, the simulation keeps changing the grids after this returns
+    def render_single(self, grid, score, generation):
+        if not self.thread.is_alive():
+            return
+
+        self.buffer.publish(("render_single", (np.array(grid), score, generation)))
+
+    def render_overlay(self, grids, alive, score, gen):
+        if not self.thread.is_alive():
+            return
+
+        self.buffer.publish(("render_overlay", (np.array(grids), np.array(alive), score, gen)))
+
+    # Stops drawing, the last published frame may be dropped
+    def close(self):
+        self.buffer.close()
+        self.thread.join()
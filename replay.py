@@ -0,0 +1,306 @@
+import argparse
+import os
+import pickle
+import struct
+
+import numpy as np
+from snakeenv import SnakeEnv, winning_score
+from snakeagent import SnakeAgent
+from renderer import Renderer
+from weightformat import load_network
+# Records episodes as keyframes plus per-step grid changes, and plays/exports them without the network or the RNG
+# Run: python replay.py record brain.snkw episode.snkr --seed 7, then python replay.py play episode.snkr --start 200
+
+"""
+File layout (little endian):
+- header: magic "SNKR", version, rows, cols, max food, seed (-1 if none), keyframe interval
+- chunks of up to keyframe interval frames, each:
+  - (first step, frames, deltas)
+  - keyframe: the whole grid at the first step, one byte per cell
+  - one (score, action, deltas) entry per frame, the first frame has no deltas and action 255
+  - one (cell, value) entry per changed cell, in frame order
+- chunk offsets, one per chunk
+- footer: offset of the chunk offsets, number of frames, number of chunks
+"""
+
+MAGIC = b"SNKR"
+VERSION = 1
+
+header_format = "<4sIIIIqI"
+chunk_format = "<QII"
+footer_format = "<QQI"
+
+frame_dtype = np.dtype([("score", "<u4"), ("action", "u1"), ("deltas", "<u4")])
+delta_dtype = np.dtype([("cell", "<u4"), ("value", "u1")])
+
+# No action led to the first frame of an episode
+NO_ACTION = 255
+
+# Writes frames as they happen, a chunk is written out each time it fills up
+class EpisodeRecorder:
+    def __init__(self, path, dimensions, max_food=1, seed=None, keyframe_interval=64):
+        if keyframe_interval <= 0:
+            raise ValueError("Error: Keyframe interval must be at least 1.")
+
+        self.path = path
+        self.dimensions = dimensions
+        self.keyframe_interval = keyframe_interval
+
+        self.file = open(path, "wb")
+        self.file.write(struct.pack(header_format, MAGIC, VERSION, dimensions[0], dimensions[1], max_food, -1 if seed is None else seed, keyframe_interval))
+
+        self.num_frames = 0
+        self.chunk_offsets = []
+
+        # Chunk being filled
+        self.keyframe = None
+        self.frames = []
+        self.deltas = []
+        self.previous = None
+
+    # Call once after reset (no action) and once after every step
+    def record(self, grid, score, action=None):
+        grid = np.array(grid, dtype=np.uint8)
+
+        if self.keyframe is None or len(self.frames) == self.keyframe_interval:
+            self.flush()
+            self.keyframe = grid
+            changed = np.empty(0, dtype=delta_dtype)
+        else:
+            # Only the cells that changed (a step touches the head, the tail and maybe food)
+            cells = np.flatnonzero(grid != self.previous)
+            changed = np.empty(len(cells), dtype=delta_dtype)
+            changed["cell"] = cells
+            changed["value"] = grid.flat[cells]
+
+        self.frames.append((score, NO_ACTION if action is None else action, len(changed)))
+        self.deltas.append(changed)
+        self.previous = grid
+        self.num_frames += 1
+
+    # Writes the chunk being filled, if there is one
+    def flush(self):
+        if self.keyframe is None:
+            return
+
+        deltas = np.concatenate(self.deltas)
+        self.chunk_offsets.append(self.file.tell())
+
+        self.file.write(struct.pack(chunk_format, self.num_frames - len(self.frames), len(self.frames), len(deltas)))
+        self.file.write(self.keyframe.tobytes())
+        self.file.write(np.array(self.frames, dtype=frame_dtype).tobytes())
+        self.file.write(deltas.tobytes())
+
+        self.keyframe = None
+        self.frames = []
+        self.deltas = []
+
+    # Finishes the file, the footer is what makes it readable
+    def close(self):
+        self.flush()
+
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.chunk_offsets, dtype="<u8").tobytes())
+        self.file.write(struct.pack(footer_format, index_offset, self.num_frames, len(self.chunk_offsets)))
+        self.file.close()
+
+# An opened recording, chunks are read when a frame in them is asked for
+class Replay:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            header = f.read(struct.calcsize(header_format))
+            magic, version, rows, cols, max_food, seed, keyframe_interval = struct.unpack(header_format, header)
+
+            if magic != MAGIC:
+                raise ValueError(f"Error: {path} is not a replay file.")
+
+            if version != VERSION:
+                raise ValueError(f"Error: Unsupported replay file version {version}.")
+
+            f.seek(-struct.calcsize(footer_format), os.SEEK_END)
+            index_offset, num_frames, num_chunks = struct.unpack(footer_format, f.read(struct.calcsize(footer_format)))
+
+        self.path = path
+        self.dimensions = [rows, cols]
+        self.max_food = max_food
+        self.seed = None if seed == -1 else seed
+        self.keyframe_interval = keyframe_interval
+        self.num_frames = num_frames
+        self.chunk_offsets = np.fromfile(path, dtype="<u8", count=num_chunks, offset=index_offset)
+
+        # Last chunk read, playing forward stays inside it for keyframe interval frames
+        self.cached_index = None
+        self.cached_chunk = None
+
+    def __len__(self):
+        return self.num_frames
+
+    # (first step, keyframe, frames, deltas, where each frame's deltas start) for one chunk
+    def chunk(self, index):
+        if self.cached_index == index:
+            return self.cached_chunk
+
+        rows, cols = self.dimensions
+        offset = int(self.chunk_offsets[index])
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            start, num_frames, num_deltas = struct.unpack(chunk_format, f.read(struct.calcsize(chunk_format)))
+
+            keyframe = np.frombuffer(f.read(rows * cols), dtype=np.uint8).reshape(rows, cols)
+            frames = np.frombuffer(f.read(num_frames * frame_dtype.itemsize), dtype=frame_dtype)
+            deltas = np.frombuffer(f.read(num_deltas * delta_dtype.itemsize), dtype=delta_dtype)
+
+        bounds = np.concatenate([[0], np.cumsum(frames["deltas"], dtype=np.int64)])
+
+        self.cached_index = index
+        self.cached_chunk = (start, keyframe, frames, deltas, bounds)
+
+        return self.cached_chunk
+
+    # Grid and score at any step, starting from the closest keyframe before it
+    def frame(self, step):
+        if step < 0 or step >= self.num_frames:
+            raise ValueError(f"Error: Step {step} is outside the replay (0 to {self.num_frames - 1}).")
+
+        start, keyframe, frames, deltas, bounds = self.chunk(step // self.keyframe_interval)
+        grid = keyframe.copy()
+
+        for i in range(1, step - start + 1):
+            changed = deltas[bounds[i]:bounds[i + 1]]
+            grid.flat[changed["cell"]] = changed["value"]
+
+        return grid, int(frames["score"][step - start])
+
+    # Yields (step, grid, score) from start to stop, the grid is changed in place so copy it to keep it
+    def frames(self, start=0, stop=None):
+        if stop is None or stop > self.num_frames:
+            stop = self.num_frames
+
+        if start >= stop:
+            return
+
+        grid, score = self.frame(start)
+        yield start, grid, score
+
+        for step in range(start + 1, stop):
+            first, keyframe, frames, deltas, bounds = self.chunk(step // self.keyframe_interval)
+            i = step - first
+
+            if i == 0:
+                grid[...] = keyframe
+            else:
+                changed = deltas[bounds[i]:bounds[i + 1]]
+                grid.flat[changed["cell"]] = changed["value"]
+
+            yield step, grid, int(frames["score"][i])
+
+    # Every action taken, in order (the first frame has none)
+    def actions(self):
+        return np.concatenate([self.chunk(i)[2]["action"][1 if i == 0 else 0:] for i in range(len(self.chunk_offsets))])
+
+# Plays one episode with a trained brain and records it, returns the final score
+def record_episode(brain, path, dimensions, max_food=1, seed=None, keyframe_interval=64):
+    # Seeded food spawns, the same seed gives the same episode
+    agent = SnakeAgent(brain)
+    env = SnakeEnv(dimensions, max_food, np.random.default_rng(seed))
+    env.reset()
+
+    recorder = EpisodeRecorder(path, dimensions, max_food, seed, keyframe_interval)
+    max_score = winning_score(dimensions)
+
+    try:
+        recorder.record(env.grid, env.score)
+
+        alive = True
+        while(alive and env.score < max_score):
+            action = agent.take_action(env)
+            alive = env.step(action)
+
+            recorder.record(env.grid, env.score, action)
+    finally:
+        recorder.close()
+
+    return env.score
+
+# Shows a replay in a window, nothing is simulated
+def play_replay(replay, start=0, stop=None, fps=30):
+    renderer = Renderer("replay", fps)
+
+    for step, grid, score in replay.frames(start, stop):
+        renderer.render_single(grid, score, step)
+
+    renderer.close()
+
+# Writes every grid and score from start to stop into one .npz file
+def export_frames(replay, path, start=0, stop=None):
+    grids = []
+    scores = []
+    for step, grid, score in replay.frames(start, stop):
+        grids.append(grid.copy())
+        scores.append(score)
+
+    np.savez_compressed(path, grids=np.array(grids), scores=np.array(scores))
+
+# Writes one PNG per frame using the renderer's colors, no window needed
+def export_images(replay, directory, start=0, stop=None, cell_size=10):
+    import pygame
+
+    os.makedirs(directory, exist_ok=True)
+
+    palette = np.array([Renderer.colors[value] for value in range(5)], dtype=np.uint8)
+
+    for step, grid, score in replay.frames(start, stop):
+        # One block of cell_size pixels per cell, surfarray wants (width, height) so rows and cols swap
+        image = np.repeat(np.repeat(palette[grid], cell_size, axis=0), cell_size, axis=1)
+        surface = pygame.surfarray.make_surface(image.transpose(1, 0, 2))
+
+        pygame.image.save(surface, os.path.join(directory, f"frame_{step:06d}.png"))
+
+# brain.pkl or a .snkw file
+def load_brain(path):
+    if path.endswith(".snkw"):
+        return load_network(path)
+
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record episodes and replay them without the network.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Play one episode with a brain and record it")
+    record.add_argument("brain", help="brain.pkl or a .snkw file")
+    record.add_argument("output", help="Where to write the recording")
+    record.add_argument("--dimensions", type=int, nargs=2, default=[15, 15])
+    record.add_argument("--max-food", type=int, default=1)
+    record.add_argument("--seed", type=int, default=None)
+    record.add_argument("--keyframe-interval", type=int, default=64)
+
+    play = commands.add_parser("play", help="Show a recording in a window")
+    play.add_argument("replay")
+    play.add_argument("--start", type=int, default=0)
+    play.add_argument("--stop", type=int, default=None)
+    play.add_argument("--fps", type=int, default=30)
+
+    export = commands.add_parser("export", help="Write a recording's frames to an .npz file or a folder of PNGs")
+    export.add_argument("replay")
+    export.add_argument("output", help="An .npz file, or a directory for PNGs with --images")
+    export.add_argument("--start", type=int, default=0)
+    export.add_argument("--stop", type=int, default=None)
+    export.add_argument("--images", action="store_true")
+    export.add_argument("--cell-size", type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        score = record_episode(load_brain(args.brain), args.output, args.dimensions, args.max_food, args.seed, args.keyframe_interval)
+        print(f"Recorded {len(Replay(args.output))} frames, score {score}")
+    elif args.command == "play":
+        play_replay(Replay(args.replay), args.start, args.stop, args.fps)
+    else:
+        replay = Replay(args.replay)
+        if args.images:
+            export_images(replay, args.output, args.start, args.stop, args.cell_size)
+        else:
+            export_frames(replay, args.output, args.start, args.stop)
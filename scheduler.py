@@ -0,0 +1,86 @@
+import heapq
+import time
+
+import numpy as np
+from geneticalgorithm import best_possible_fitness
+# Decides which agents still get to play in a generation and when the generation ends
+
+class GenerationScheduler:
+    def __init__(self, step_budget=None, time_budget=None, top_k=None):
+        # Bounds checking
+        if step_budget is not None and step_budget <= 0:
+            raise ValueError("Error: Step budget must be at least 1.")
+
+        if time_budget is not None and time_budget <= 0:
+            raise ValueError("Error: Time budget must be above 0 seconds.")
+
+        if top_k is not None and top_k <= 0:
+            raise ValueError("Error: Top k must be at least 1.")
+
+        # Max steps per generation, max seconds per generation, and how many top agents early cutoff protects
+        self.step_budget = step_budget
+        self.time_budget = time_budget
+        self.top_k = top_k
+
+    def start(self, num_agents):
+        # Agents still playing, slots map agent index -> position in active (-1 once removed)
+        self.active = list(range(num_agents))
+        self.slots = list(range(num_agents))
+
+        # Min-heap of the k best fitnesses among agents that have stopped
+        self.finished = []
+
+        self.ticks = 0
+        self.start_time = time.perf_counter()
+
+    # Removes a stopped agent in O(1) by moving the last active agent into its slot
+    def remove(self, index, fitness):
+        slot = self.slots[index]
+        if slot == -1:
+            return
+
+        last = self.active.pop()
+        if last != index:
+            self.active[slot] = last
+            self.slots[last] = slot
+
+        self.slots[index] = -1
+
+        # Keep track of the top k final fitnesses for early cutoff
+        if self.top_k is not None:
+            if len(self.finished) < self.top_k:
+                heapq.heappush(self.finished, fitness)
+            elif fitness > self.finished[0]:
+                heapq.heapreplace(self.finished, fitness)
+
+    def tick(self):
+        self.ticks += 1
+
+    # True once the generation has used up its steps or time
+    def out_of_budget(self):
+        if self.step_budget is not None and self.ticks >= self.step_budget:
+            return True
+
+        if self.time_budget is not None and time.perf_counter() - self.start_time >= self.time_budget:
+            return True
+
+        return False
+
+    # Cutoff needs a step budget (to bound what agents can still do) and k agents that already finished
+    def can_cut(self):
+        return (
+            self.top_k is not None
+            and self.step_budget is not None
+            and len(self.finished) == self.top_k
+        )
+
+    # Active agents that can't reach the top k even if they eat on every remaining step
+    def hopeless(self, scores, steps):
+        if not self.can_cut():
+            return []
+
+        active = np.array(self.active, dtype=np.intp)
+        remaining = self.step_budget - self.ticks
+        best = best_possible_fitness(np.asarray(scores)[active], np.asarray(steps)[active], remaining)
+
+        return active[best < self.finished[0]].tolist()
@@ -0,0 +1,28 @@
+import numpy as np
+# Every env, network initializer, and GA operator gets its own Generator, all spawned from one root seed
+
+# Streams under the root seed
+ENV_STREAM = 0
+NETWORK_STREAM = 1
+GA_STREAM = 2
+EPISODE_STREAM = 3
+
+# Root entropy for a run (a plain int, so it fits in checkpoints and pickles cheaply), a fresh one if seed is None
+def root_seed(seed=None):
+    return np.random.SeedSequence(seed).entropy
+
+# Same SeedSequence that SeedSequence(root).spawn() would give at this key path, without spawning every child before it
+def child_seed(root, *key):
+    return np.random.SeedSequence(root, spawn_key=key)
+
+# Food spawns for agent index's game in generation gen, the same whether it's played serially, batched, or in a worker
+def env_rng(root, gen, index):
+    return np.random.default_rng(child_seed(root, ENV_STREAM, gen, index))
+
+# One Generator per agent for its starting weights
+def network_rngs(root, count):
+    return [np.random.default_rng(child) for child in child_seed(root, NETWORK_STREAM).spawn(count)]
+
+# Selection, crossover, and mutation for the whole run
+def ga_rng(root):
+    return np.random.default_rng(child_seed(root, GA_STREAM))
@@ -1,8 +1,12 @@
 from collections import deque
 import numpy as np
 
+# Score that beats the game, the snake starts one cell long so the board is full one food short of the interior
+def winning_score(dimensions):
+    return (dimensions[0] - 2) * (dimensions[1] - 2) - 1
+
 class SnakeEnv:
-    def __init__(self, dimensions=[15, 15], max_food=1): # Will replace with kwargs later?
+    def __init__(self, dimensions=[15, 15], max_food=1, rng=None): # Will replace with kwargs later?
         # Bounds checking
         if dimensions[0] <= 4 or dimensions[1] <= 4:
             raise ValueError("Error: Grid size must be at least 5x5.")
@@ -17,7 +21,14 @@ class SnakeEnv:
         self.max_food = max_food
         self.food_positions = []
 
-    def reset(self):
+        # Food spawns come from this game's own Generator
+        self.rng = np.random.default_rng(rng)
+
+    # Pass a Generator to start this episode's food spawns from a known stream
+    def reset(self, rng=None):
+        if rng is not None:
+            self.rng = rng
+
         self.head_pos = [self.dimensions[0] // 2, self.dimensions[1] // 2]
         self.body = deque()
 
@@ -27,6 +38,7 @@ class SnakeEnv:
 
         # Remake the grid state
         self.update_grid()
+        self.index_free_cells()
 
         # Spawn initial food
         self.spawn_food(self.max_food)
@@ -45,6 +57,7 @@ class SnakeEnv:
 
         return direction
         
+    # Rebuilds the whole grid from scratch, step only touches the cells that changed
     def update_grid(self):
         # Initialize empty grid
         self.grid = np.zeros((self.dimensions[0], self.dimensions[1]))
@@ -64,14 +77,48 @@ class SnakeEnv:
         for pos in self.food_positions:
             self.grid[pos[0], pos[1]] = 3
 
+    # Builds the free cell index from the grid (swap-remove list + cell -> slot map)
+    def index_free_cells(self):
+        self.free_cells = np.flatnonzero(self.grid == 0).tolist()
+
+        self.free_slots = [-1] * (self.dimensions[0] * self.dimensions[1])
+        for slot, cell in enumerate(self.free_cells):
+            self.free_slots[cell] = slot
+
+    # Removes a cell from the free index by moving the last free cell into its slot
+    def occupy_cell(self, row, col):
+        cell = row * self.dimensions[1] + col
+        slot = self.free_slots[cell]
+
+        last = self.free_cells.pop()
+        if last != cell:
+            self.free_cells[slot] = last
+            self.free_slots[last] = slot
+
+        self.free_slots[cell] = -1
+
+    # Adds a cell back to the end of the free index
+    def release_cell(self, row, col):
+        cell = row * self.dimensions[1] + col
+
+        self.free_slots[cell] = len(self.free_cells)
+        self.free_cells.append(cell)
+
     def spawn_food(self, num_food):
         # Spawn food in open positions
         for _ in range(num_food):
-            open = np.argwhere(self.grid == 0)
+            # A full board has nowhere to put food
+            if not self.free_cells:
+                break
+
+            cell = self.free_cells[self.rng.integers(len(self.free_cells))]
+            row, col = divmod(cell, self.dimensions[1])
 
-            row, col = open[np.random.choice(len(open))]
+            # Occupy the cell right away so the next food can't land on it
+            self.occupy_cell(row, col)
 
             self.food_positions.append([row, col])
+            self.grid[row, col] = 3
 
     def step(self, action):
         self.steps_without_food += 1
@@ -85,22 +132,30 @@ class SnakeEnv:
         # Get new head position
         new_pos = [self.head_pos[0] + action_pos[0], self.head_pos[1] + action_pos[1]]
 
+        # The grid is kept in sync with the body and food, so it doubles as an occupancy map
+        target = self.grid[new_pos[0], new_pos[1]]
+
         # If moving snake head to new location hits wall, end episode
-        if self.grid[new_pos[0], new_pos[1]] == 4:
+        if target == 4:
             return False
 
         # If moving snake head to new location hits itself, end episode
-        if new_pos in self.body:
+        if target == 2:
             return False
 
         # If not, add current head position to body
         self.body.appendleft(self.head_pos)
+        self.grid[self.head_pos[0], self.head_pos[1]] = 2
 
         # Move head based on action
         self.head_pos = new_pos
 
+        # Food cells are already out of the free index
+        if target == 0:
+            self.occupy_cell(new_pos[0], new_pos[1])
+
         # If snake eats food, spawn 1 new food and don't remove last body segment
-        if self.head_pos in self.food_positions:
+        if target == 3:
             self.food_positions.remove(self.head_pos)
             self.spawn_food(1)
             self.score += 1
@@ -110,8 +165,197 @@ class SnakeEnv:
 
         else:
             # Remove last body segment location
-            self.body.pop()
+            tail = self.body.pop()
+            self.grid[tail[0], tail[1]] = 0
+            self.release_cell(tail[0], tail[1])
 
-        self.update_grid()
+        self.grid[self.head_pos[0], self.head_pos[1]] = 1
+
+        return True
+
+# Holds a whole population of games in stacked arrays so they can all be stepped at once
+class BatchedSnakeEnv:
+    def __init__(self, num_envs, dimensions=[15, 15], max_food=1, rngs=None):
+        # Bounds checking
+        if num_envs <= 0:
+            raise ValueError("Error: Number of environments must be at least 1.")
+
+        if dimensions[0] <= 4 or dimensions[1] <= 4:
+            raise ValueError("Error: Grid size must be at least 5x5.")
+        
+        if max_food <= 0:
+            raise ValueError("Error: Max food must be at least 1.")
+
+        self.num_envs = num_envs
+        self.dimensions = dimensions
+        self.max_food = max_food
+
+        # Body is stored as a ring buffer per game, it can never be longer than the board
+        self.capacity = dimensions[0] * dimensions[1]
+
+        # One Generator per game, so a game's food only depends on its own stream (same draws as SnakeEnv)
+        if rngs is None:
+            rngs = [np.random.default_rng(child) for child in np.random.SeedSequence().spawn(num_envs)]
+        self.set_rngs(rngs)
+
+    def set_rngs(self, rngs):
+        if len(rngs) != self.num_envs:
+            raise ValueError("Error: Need one Generator per environment.")
+
+        self.rngs = list(rngs)
+
+    # Pass one Generator per game to start this episode's food spawns from known streams
+    def reset(self, rngs=None):
+        if rngs is not None:
+            self.set_rngs(rngs)
+
+        n = self.num_envs
+        rows, cols = self.dimensions
+        envs = np.arange(n)
+
+        # Same grid values as SnakeEnv (0 empty, 1 head, 2 body, 3 food, 4 wall)
+        self.grid = np.zeros((n, rows, cols), dtype=np.int8)
+        self.grid[:, 0, :] = 4
+        self.grid[:, -1, :] = 4
+        self.grid[:, :, 0] = 4
+        self.grid[:, :, -1] = 4
+
+        self.head_pos = np.tile(np.array([rows // 2, cols // 2], dtype=np.intp), (n, 1))
+        self.previous_direction = np.tile(np.array([-1, 0], dtype=np.intp), (n, 1))
+
+        # Body segments, newest segment at body_start (like deque.appendleft)
+        self.body = np.zeros((n, self.capacity, 2), dtype=np.intp)
+        self.body_start = np.zeros(n, dtype=np.intp)
+        self.body_length = np.zeros(n, dtype=np.intp)
+
+        self.food_positions = np.zeros((n, self.max_food, 2), dtype=np.intp)
+        self.steps_without_food = np.zeros(n, dtype=np.intp)
+        self.score = np.zeros(n, dtype=np.intp)
+        self.steps = np.zeros(n, dtype=np.intp)
+        self.alive = np.ones(n, dtype=bool)
+
+        self.grid[envs, self.head_pos[:, 0], self.head_pos[:, 1]] = 1
+
+        # Free cell index per game, every board starts out the same
+        free = np.flatnonzero(self.grid[0] == 0)
+        self.free_cells = np.zeros((n, self.capacity), dtype=np.intp)
+        self.free_cells[:, :len(free)] = free
+        self.free_slots = np.full((n, self.capacity), -1, dtype=np.intp)
+        self.free_slots[:, free] = np.arange(len(free))
+        self.free_count = np.full(n, len(free), dtype=np.intp)
+
+        # Spawn initial food
+        for slot in range(self.max_food):
+            self.spawn_food(envs, slot)
+
+    # Same swap-remove free cell index as SnakeEnv, for one cell in each of envs (no game twice)
+    def occupy_cells(self, envs, cells):
+        slots = self.free_slots[envs, cells]
+
+        self.free_count[envs] -= 1
+        last = self.free_cells[envs, self.free_count[envs]]
+
+        self.free_cells[envs, slots] = last
+        self.free_slots[envs, last] = slots
+        self.free_slots[envs, cells] = -1
+
+    def release_cells(self, envs, cells):
+        self.free_slots[envs, cells] = self.free_count[envs]
+        self.free_cells[envs, self.free_count[envs]] = cells
+        self.free_count[envs] += 1
+
+    def spawn_food(self, envs, slot):
+        # A full board has nowhere to put food
+        envs = envs[self.free_count[envs] > 0]
+
+        # Each game draws from its own stream, the same draw SnakeEnv.spawn_food makes
+        picks = np.array([self.rngs[env].integers(self.free_count[env]) for env in envs], dtype=np.intp)
+        cells = self.free_cells[envs, picks]
+
+        # Occupy the cells right away so the next food can't land on them
+        self.occupy_cells(envs, cells)
+
+        rows, cols = np.divmod(cells, self.dimensions[1])
+
+        self.food_positions[envs, slot, 0] = rows
+        self.food_positions[envs, slot, 1] = cols
+        self.grid[envs, rows, cols] = 3
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        cols = self.dimensions[1]
+        live = np.flatnonzero(self.alive)
+
+        self.steps[live] += 1
+        self.steps_without_food[live] += 1
+
+        # Timer to stop going in circles
+        starved = self.steps_without_food[live] >= 100
+        self.alive[live[starved]] = False
+        live = live[~starved]
+
+        # Turn left/right or go straight, same as SnakeEnv.action_to_direction
+        action = actions[live]
+        direction = self.previous_direction[live]
+        turned = direction.copy()
+
+        left = action == 0
+        turned[left, 0] = direction[left, 1]
+        turned[left, 1] = -direction[left, 0]
+
+        right = action == 1
+        turned[right, 0] = -direction[right, 1]
+        turned[right, 1] = direction[right, 0]
+
+        self.previous_direction[live] = turned
+
+        # Get new head positions
+        new_pos = self.head_pos[live] + turned
+        target = self.grid[live, new_pos[:, 0], new_pos[:, 1]]
+
+        # Hitting a wall or itself ends the episode
+        crashed = (target == 4) | (target == 2)
+        self.alive[live[crashed]] = False
+
+        live = live[~crashed]
+        new_pos = new_pos[~crashed]
+        ate = target[~crashed] == 3
+
+        # Food cells are already out of the free index
+        empty = target[~crashed] == 0
+        self.occupy_cells(live[empty], new_pos[empty, 0] * cols + new_pos[empty, 1])
+
+        # Add current head positions to the front of each body
+        old_pos = self.head_pos[live]
+        self.body_start[live] = (self.body_start[live] - 1) % self.capacity
+        self.body[live, self.body_start[live]] = old_pos
+        self.body_length[live] += 1
+        self.grid[live, old_pos[:, 0], old_pos[:, 1]] = 2
+
+        # Snakes that didn't eat lose their last body segment
+        movers = live[~ate]
+        tail_index = (self.body_start[movers] + self.body_length[movers] - 1) % self.capacity
+        tail = self.body[movers, tail_index]
+        self.grid[movers, tail[:, 0], tail[:, 1]] = 0
+        self.release_cells(movers, tail[:, 0] * cols + tail[:, 1])
+        self.body_length[movers] -= 1
+
+        # Move heads
+        self.head_pos[live] = new_pos
+        self.grid[live, new_pos[:, 0], new_pos[:, 1]] = 1
+
+        # Snakes that ate get a new food and reset their timer
+        eaters = live[ate]
+        if len(eaters) > 0:
+            self.score[eaters] += 1
+            self.steps_without_food[eaters] = 0
+
+            # Move the eaten food to the last slot, like list.remove followed by append
+            food = self.food_positions[eaters]
+            eaten = np.all(food == new_pos[ate][:, None, :], axis=2)
+            order = np.argsort(eaten, axis=1, kind="stable")
+            self.food_positions[eaters] = np.take_along_axis(food, order[:, :, None], axis=1)
+
+            self.spawn_food(eaters, self.max_food - 1)
 
-        return True
\ No newline at end of file
+        return self.alive.copy()
@@ -1,8 +1,20 @@
-from snakeenv import SnakeEnv
+from snakeenv import SnakeEnv, BatchedSnakeEnv, winning_score
 from snakeagent import SnakeAgent
+from neuralnetwork import PopulationNetwork
 from renderer import Renderer
-from geneticalgorithm import repopulate
-
+from renderthread import RenderThread
+from geneticalgorithm import repopulate_into, make_selection
+from gameplay import play_serial, play_batched
+from parallel import ParallelEvaluator
+from weightstore import WeightStore
+from instrumentation import NullProfiler
+from checkpoint import CheckpointManager, NullCheckpoints, load_checkpoint
+from weightformat import load_network
+from scheduler import GenerationScheduler
+from seeding import root_seed, network_rngs, ga_rng
+
+import numpy as np
+import os
 import pickle
 
 # Run this to train and evaluate the genetic algorithm
@@ -20,75 +32,112 @@ Core loop:
 - Repeat
 """
 
-def evaluate(num_agents, num_episodes, num_offspring, env_dimensions, render_mode):
-    renderer = Renderer(render_mode, render_fps=6000)
+def evaluate(num_agents, num_episodes, num_offspring, env_dimensions, render_mode, batched=False, workers=0, seed=None, profiler=None, checkpoints=None, resume=None, dtype=np.float64, scheduler=None, multi_episode=None, selection=None, render_thread=False):
+    # A render thread draws the newest frame at its own pace instead of holding up every step
+    if render_thread and render_mode is not None:
+        renderer = RenderThread(render_mode)
+    else:
+        renderer = Renderer(render_mode, render_fps=6000)
+
+    # Profiling is opt-in, pass a Profiler with callbacks to get per-generation records
+    if profiler is None:
+        profiler = NullProfiler()
+
+    # Best brain goes to brain.pkl, population goes to checkpoints/ every generation (newest few kept), False writes nothing
+    if checkpoints is None:
+        checkpoints = CheckpointManager()
+    elif checkpoints is False:
+        checkpoints = NullCheckpoints()
+
+    # No step/time budget or early cutoff unless asked for (not used by the worker pool)
+    if scheduler is None:
+        scheduler = GenerationScheduler()
+
+    # A resumed run keeps its seed unless given a new one
+    state = None
+    if resume is not None:
+        state = load_checkpoint(resume)
+
+        if seed is None:
+            seed = state["seed"]
+
+    # Envs, starting weights, and the GA all get their own Generator from this, so the same seed gives the same run in every mode
+    seed = root_seed(seed)
+    rng = ga_rng(seed)
+
+    # float32 halves memory and bandwidth, float16 halves it again (math is still float32)
+    agents = [SnakeAgent(dtype=dtype, rng=agent_rng) for agent_rng in network_rngs(seed, num_agents)]
+
+    # Every agent's weights live in one buffer, shared with the workers when there are any
+    store = WeightStore(num_agents, agents[0].brain.neurons, dtype, shared=workers > 0)
+    store.bind(agents)
+
+    # Pick up a previous run's population, GA Generator state, and generation
+    start_gen = 0
+    if state is not None:
+        start_gen = checkpoints.restore(state, store, rng)
+
+    # Episodes come from the same root seed as everything else
+    if multi_episode is not None:
+        multi_episode.use_run_seed(seed)
+
+    if workers > 0:
+        # Games are played in worker processes, so there is nothing to render here
+        evaluator = ParallelEvaluator(workers, env_dimensions, seed=seed, store=store, dtype=dtype)
+    elif batched:
+        # One environment holding every game, one network holding every brain
+        env = BatchedSnakeEnv(num_agents, dimensions=env_dimensions)
+        network = PopulationNetwork([agent.brain for agent in agents], store)
+    else:
+        # Agent/Environment pairs
+        pairs = {}
+        for agent in agents:
+            pairs[agent] = SnakeEnv(dimensions=env_dimensions)
 
-    # Agent/Environment pairs
-    pairs = {}
-    for _ in range(num_agents):
-        pairs[SnakeAgent()] = SnakeEnv(dimensions=env_dimensions)
-
-    for gen in range(num_episodes):
-        # Put agents into a list so we can remove them one by one
-        agents = list(pairs.keys())
-        
-        # Reset each agent's environment and values
-        for agent, env in pairs.items():
-            env.reset()
-            agent.score = 0
-            agent.alive = True
-            agent.steps = 0
-            agent.steps_without_food = 0
-
-        # All agents equal at the start
-        best_agent = agents[0]
-
-        while(True):
-            if render_mode == "single":
-                renderer.render_single(list(pairs.values())[0].grid, list(pairs.keys())[0].score, gen)
-            elif render_mode == "overlay":
-                renderer.render_overlay(pairs, gen)
-            elif render_mode == "best":
-                renderer.render_single(pairs[best_agent].grid, best_agent.score, gen)
-            
-            # Move to next episode when all agents die
-            count = len(agents)
-            for agent in agents:
-                if not agent.alive:
-                    count -= 1
-            if count == 0:
-                break
-
-            for agent in agents:
-                # Stop agent playing if dead
-                if not agent.alive:
-                    continue
-
-                # Each agent takes an action according to their gene policy
-                action = agent.take_action(pairs[agent])
-
-                # Update agent's info
-                agent.alive = pairs[agent].step(action)
-                agent.score = pairs[agent].score
-                agent.steps_without_food = pairs[agent].steps_without_food
-
-                # Agent beat the game, and therefore has the optimal policy
-                if agent.score == (env_dimensions[0] - 2) * (env_dimensions[1] - 2):
-                    return agent
-                
-                # Best agent = highest score while still alive
-                # if agent.score > best_agent.score or not best_agent.alive:
-                #     best_agent = agent
-                if agent.score > best_agent.score:
-                    with open("brain.pkl", "wb") as f:
-                        pickle.dump(best_agent.brain, f)
-
-        # At the end of each episode, create the next generation of agents
-        new_population = repopulate(agents, num_offspring)
-
-        # Set the new weights for each agent
-        for i in range(num_agents):
-            agents[i].set_weights(new_population[i])
+    try:
+        for gen in range(start_gen, num_episodes):
+            if workers > 0:
+                with profiler.phase("play"):
+                    winner = evaluator.play(agents, gen)
+            elif multi_episode is not None:
+                # Several seeded episodes per agent (a MultiEpisodeEvaluator), nothing rendered
+                with profiler.phase("play"):
+                    winner = multi_episode.play(agents, gen)
+            elif batched:
+                winner = play_batched(agents, env, network, renderer, render_mode, gen, env_dimensions, profiler, scheduler, seed)
+            else:
+                winner = play_serial(pairs, renderer, render_mode, gen, env_dimensions, profiler, scheduler, seed)
+
+            # Remember the best brain before repopulate overwrites it
+            with profiler.phase("checkpoint"):
+                checkpoints.update_best(agents)
+
+            if winner is not None:
+                profiler.end_generation(gen, agents)
+                return winner
+
+            # At the end of each episode, create the next generation of agents in place
+            with profiler.phase("repopulate"):
+                repopulate_into(agents, num_offspring, store, selection, rng)
+
+            with profiler.phase("checkpoint"):
+                checkpoints.save_population(gen + 1, store, seed, rng)
+
+            profiler.end_generation(gen, agents)
+    finally:
+        if workers > 0:
+            evaluator.close()
+
+        if isinstance(renderer, RenderThread):
+            renderer.close()
+
+        # Let the writer thread finish before the weights go away
+        checkpoints.close()
+
+        # Agents keep their own weights after the (possibly shared) buffer goes away
+        store.unbind(agents)
+        store.close()
+        store.unlink()
 
 def run_trained(brain, env_dimensions, max_food):
     renderer = Renderer(render_mode, render_fps=6000)
@@ -103,7 +152,8 @@ def run_trained(brain, env_dimensions, max_food):
         agent.steps = 0
         agent.steps_without_food = 0
 
-        while(agent.alive):
+        # A full board is a win, start over
+        while(agent.alive and agent.score < winning_score(env_dimensions)):
             renderer.render_single(env.grid, agent.score, 0)
 
             action = agent.take_action(env)
@@ -201,8 +251,12 @@ if __name__ == "__main__":
     if render_mode == "play":
         play(env_dimensions, max_food)
     elif render_mode == "trained":
-        with open("brain.pkl", "rb") as f:
-            brain = pickle.load(f)
+        # Prefer the flat weight file, fall back to the pickled brain
+        if os.path.exists("brain.snkw"):
+            brain = load_network("brain.snkw")
+        else:
+            with open("brain.pkl", "rb") as f:
+                brain = pickle.load(f)
         run_trained(brain, env_dimensions, max_food)
     else:
         # num_agents, num_episodes, num_offspring = get_params_2()
@@ -212,7 +266,19 @@ if __name__ == "__main__":
 
         num_offspring = 125
 
-        optimal_agent = evaluate(num_agents, num_episodes, num_offspring, env_dimensions, render_mode)
+        # Step the whole population at once instead of one agent at a time
+        batched = True
+
+        # Set above 0 to play each generation across a pool of processes instead
+        workers = 0
+
+        # Tournament keeps diversity, softmax on raw fitness gives nearly every pick to the best agent
+        selection = make_selection("tournament", size=3)
+
+        # Draw from a separate thread so watching doesn't slow training down (Linux/Windows only)
+        render_thread = False
+
+        optimal_agent = evaluate(num_agents, num_episodes, num_offspring, env_dimensions, render_mode, batched, workers, selection=selection, render_thread=render_thread)
 
     
     
\ No newline at end of file
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from snaketest import evaluate
+from instrumentation import Profiler
+# The same seed has to give the same run whether games are played serially, batched, or in worker processes
+
+# Keeps each generation's scores and the population weights that come out of it
+class RunRecorder(Profiler):
+    def __init__(self):
+        super().__init__()
+        self.generations = []
+
+    def end_generation(self, gen, agents):
+        record = super().end_generation(gen, agents)
+
+        weights = np.concatenate([layer.ravel() for agent in agents for layer in agent.brain.layers])
+        self.generations.append(([agent.score for agent in agents], [agent.steps for agent in agents], weights))
+
+        return record
+
+def run(dtype, **mode):
+    recorder = RunRecorder()
+    evaluate(24, 4, 12, [10, 10], None, seed=1234, profiler=recorder, checkpoints=False, dtype=dtype, **mode)
+
+    return recorder.generations
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_modes_give_identical_runs(dtype):
+    serial = run(dtype)
+    assert len(serial) == 4
+
+    for mode in [{"batched": True}, {"workers": 1}, {"workers": 2}]:
+        other = run(dtype, **mode)
+        assert len(other) == len(serial)
+
+        for (scores, steps, weights), (other_scores, other_steps, other_weights) in zip(serial, other):
+            assert other_scores == scores
+            assert other_steps == steps
+            np.testing.assert_array_equal(other_weights, weights)
+
+def test_seed_changes_the_run():
+    first = run(np.float64)
+
+    recorder = RunRecorder()
+    evaluate(24, 4, 12, [10, 10], None, seed=4321, profiler=recorder, checkpoints=False)
+
+    assert not np.array_equal(first[-1][2], recorder.generations[-1][2])
@@ -0,0 +1,55 @@
+import numpy as np
+
+import parallel
+from snakeenv import SnakeEnv, BatchedSnakeEnv, winning_score
+from snakeagent import SnakeAgent
+from gameplay import play_serial, play_batched
+from instrumentation import NullProfiler
+from scheduler import GenerationScheduler
+from seeding import env_rng
+from test_snakeenv import cycle_action
+# Every play loop has to stop with a win once a snake fills the board, vision has no food to look at after that
+
+# Follows the board-filling cycle instead of using a network, vision still runs on every step
+class CycleBrain:
+    def __init__(self, env):
+        self.env = env
+        self.compute_dtype = np.float64
+
+    def predict_action(self, inputs):
+        return cycle_action(self.env.head_pos, self.env.previous_direction)
+
+class CycleNetwork:
+    def __init__(self, env):
+        self.env = env
+        self.compute_dtype = np.float64
+
+    def load(self):
+        pass
+
+    def predict_actions(self, inputs, alive):
+        return [cycle_action(head, direction) for head, direction in zip(self.env.head_pos, self.env.previous_direction)]
+
+def test_serial_play_wins_on_a_full_board():
+    env = SnakeEnv([5, 6], 1)
+    agent = SnakeAgent(CycleBrain(env))
+
+    assert play_serial({agent: env}, None, None, 0, [5, 6], NullProfiler(), GenerationScheduler(), 3) is agent
+    assert agent.score == winning_score([5, 6])
+
+def test_batched_play_wins_on_a_full_board():
+    env = BatchedSnakeEnv(2, [5, 6], 1)
+    agents = [SnakeAgent(), SnakeAgent()]
+
+    # The generation ends with the first snake that fills its board
+    winner = play_batched(agents, env, CycleNetwork(env), None, None, 0, [5, 6], NullProfiler(), GenerationScheduler(), 3)
+    assert winner in agents
+    assert winner.score == winning_score([5, 6])
+
+def test_worker_episode_wins_on_a_full_board():
+    env = SnakeEnv([5, 6], 1)
+    parallel.worker_env = env
+    parallel.worker_agent = SnakeAgent(CycleBrain(env))
+
+    score, steps, steps_without_food = parallel.play_episode(env_rng(3, 0, 0))
+    assert score == winning_score([5, 6])
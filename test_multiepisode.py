@@ -0,0 +1,36 @@
+from snakeagent import SnakeAgent
+from multiepisode import play_episodes, MultiEpisodeEvaluator
+from fitnesscache import FitnessCache
+from seeding import network_rngs
+# An agent's episode only depends on its weights and the episode seed, never on who it's batched with
+
+def make_agents(count, seed=0):
+    return [SnakeAgent(rng=rng) for rng in network_rngs(seed, count)]
+
+def test_result_does_not_depend_on_batch():
+    agents = make_agents(8)
+    batched = play_episodes([agent.brain for agent in agents], [10, 10], 2, 1234)
+
+    for i, agent in enumerate(agents):
+        alone = play_episodes([agent.brain], [10, 10], 2, 1234)
+
+        for batch_values, alone_values in zip(batched, alone):
+            assert batch_values[i] == alone_values[0]
+
+def test_fixed_seeds_cache_is_exact():
+    agents = make_agents(10)
+
+    cached = MultiEpisodeEvaluator([10, 10], episodes=3, seed=7, fixed_seeds=True, cache=FitnessCache())
+    cached.play(agents, 0)
+    first = [agent.fitness for agent in agents]
+
+    # Second generation replays the same episodes, so everything comes from the cache
+    cached.play(agents, 1)
+    assert cached.cache.hits == len(agents)
+    assert [agent.fitness for agent in agents] == first
+
+    # Playing the same agents in a different order and batch gives the same results
+    fresh = MultiEpisodeEvaluator([10, 10], episodes=3, seed=7, fixed_seeds=True)
+    reordered = agents[::-1][:6]
+    fresh.play(reordered, 5)
+    assert [agent.fitness for agent in reordered] == first[::-1][:6]
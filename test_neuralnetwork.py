@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from snakeagent import SnakeAgent
+from neuralnetwork import PopulationNetwork
+from weightstore import WeightStore
+from seeding import network_rngs
+# One batched forward pass has to pick the same actions as every network on its own
+
+def make_agents(count, dtype, seed=0):
+    return [SnakeAgent(dtype=dtype, rng=rng) for rng in network_rngs(seed, count)]
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32, np.float16])
+@pytest.mark.parametrize("use_store", [False, True])
+def test_population_matches_single_networks(dtype, use_store):
+    agents = make_agents(20, dtype)
+
+    store = None
+    if use_store:
+        store = WeightStore(len(agents), agents[0].brain.neurons, dtype)
+        store.bind(agents)
+
+    network = PopulationNetwork([agent.brain for agent in agents], store)
+
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        inputs = rng.integers(-1, 15, size=(len(agents), 22)).astype(float)
+
+        expected = [agent.brain.predict_action(row) for agent, row in zip(agents, inputs)]
+        np.testing.assert_array_equal(network.predict_actions(inputs), expected)
+
+        outputs = network.predict(inputs)
+        for agent, row, output in zip(agents, inputs, outputs):
+            np.testing.assert_allclose(output, agent.brain.predict(row), rtol=1e-5)
+
+def test_dead_agents_are_masked():
+    agents = make_agents(20, np.float64)
+    network = PopulationNetwork([agent.brain for agent in agents])
+
+    rng = np.random.default_rng(2)
+    inputs = rng.integers(-1, 15, size=(len(agents), 22)).astype(float)
+    alive = rng.random(len(agents)) < 0.5
+
+    actions = network.predict_actions(inputs, alive)
+    outputs = network.predict(inputs, alive)
+
+    for i, agent in enumerate(agents):
+        if alive[i]:
+            assert actions[i] == agent.brain.predict_action(inputs[i])
+            np.testing.assert_allclose(outputs[i], agent.brain.predict(inputs[i]))
+        else:
+            assert actions[i] == 0
+            assert not outputs[i].any()
+
+    # Nobody alive still gives one action per agent
+    assert network.predict_actions(inputs, np.zeros(len(agents), dtype=bool)).tolist() == [0] * len(agents)
+
+def test_load_picks_up_new_weights():
+    agents = make_agents(6, np.float64)
+    network = PopulationNetwork([agent.brain for agent in agents])
+
+    agents[0].set_weights([layer.copy() for layer in agents[1].brain.layers])
+    network.load()
+
+    inputs = np.random.default_rng(3).integers(-1, 15, size=(len(agents), 22)).astype(float)
+    inputs[0] = inputs[1]
+
+    actions = network.predict_actions(inputs)
+    assert actions[0] == actions[1] == agents[1].brain.predict_action(inputs[1])
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from snakeenv import SnakeEnv, BatchedSnakeEnv, winning_score
+from seeding import env_rng
+# The grid step keeps up to date has to match a full update_grid() rebuild, and the free cell index has to match the grid
+
+# Heads for the food most of the time so snakes grow long, random turns otherwise
+def pick_action(env, rng):
+    if rng.random() < 0.3:
+        return int(rng.integers(0, 3))
+
+    best_action, best_distance = 2, None
+    for action in [2, 0, 1]:
+        row, col = env.previous_direction
+        if action == 0:
+            row, col = col, -row
+        elif action == 1:
+            row, col = -col, row
+
+        target = [env.head_pos[0] + row, env.head_pos[1] + col]
+        if env.grid[target[0], target[1]] in (2, 4):
+            continue
+
+        food = env.food_positions[0]
+        distance = abs(target[0] - food[0]) + abs(target[1] - food[1])
+        if best_distance is None or distance < best_distance:
+            best_action, best_distance = action, distance
+
+    return best_action
+
+def check_state(env):
+    incremental = env.grid.copy()
+    env.update_grid()
+
+    np.testing.assert_array_equal(incremental, env.grid)
+    assert sorted(env.free_cells) == np.flatnonzero(env.grid == 0).tolist()
+
+    for slot, cell in enumerate(env.free_cells):
+        assert env.free_slots[cell] == slot
+
+@pytest.mark.parametrize("dimensions, max_food, seed", [
+    ([15, 15], 1, 0),
+    ([10, 10], 3, 1),
+    ([7, 12], 2, 2)
+])
+def test_incremental_grid_matches_rebuild(dimensions, max_food, seed):
+    rng = np.random.default_rng(seed)
+    env = SnakeEnv(dimensions, max_food, rng=np.random.default_rng(seed + 100))
+    env.reset()
+    check_state(env)
+
+    longest = 0
+    for _ in range(5000):
+        if not env.step(pick_action(env, rng)):
+            longest = max(longest, env.score)
+            env.reset()
+
+        check_state(env)
+
+    # Long enough games that food was eaten and respawned many times
+    assert longest >= 10
+
+# Closed path through every interior cell of a 5x6 board, following it can never crash
+cycle = [(1, 1), (1, 2), (1, 3), (1, 4), (2, 4), (3, 4), (3, 3), (2, 3), (2, 2), (3, 2), (3, 1), (2, 1)]
+next_cell = {cell: cycle[(i + 1) % len(cycle)] for i, cell in enumerate(cycle)}
+
+# Action that moves a head onto the next cell of the cycle
+def cycle_action(head, direction):
+    row, col = next_cell[(int(head[0]), int(head[1]))]
+    move = [row - head[0], col - head[1]]
+
+    if move == [direction[1], -direction[0]]:
+        return 0
+    elif move == [-direction[1], direction[0]]:
+        return 1
+
+    return 2
+
+@pytest.mark.parametrize("max_food", [1, 2])
+def test_filling_the_board_wins_in_both_envs(max_food):
+    env = SnakeEnv([5, 6], max_food, rng=env_rng(3, 0, 0))
+    batched = BatchedSnakeEnv(1, [5, 6], max_food)
+    env.reset()
+    batched.reset([env_rng(3, 0, 0)])
+
+    while(env.score < winning_score([5, 6])):
+        assert env.step(cycle_action(env.head_pos, env.previous_direction))
+        assert batched.step([cycle_action(batched.head_pos[0], batched.previous_direction[0])])[0]
+
+        np.testing.assert_array_equal(env.grid, batched.grid[0])
+        assert env.score == batched.score[0]
+
+    # Nothing left to spawn food on, and the score is one short of the interior since the snake started one cell long
+    assert env.score == (5 - 2) * (6 - 2) - 1
+    assert not env.free_cells and not env.food_positions
+    assert batched.free_count[0] == 0
+    assert not (env.grid == 0).any() and not (env.grid == 3).any()
+
+@pytest.mark.parametrize("dimensions, max_food, seed", [
+    ([15, 15], 1, 0),
+    ([10, 10], 3, 1),
+    ([7, 12], 2, 2)
+])
+def test_batched_env_matches_serial_envs(dimensions, max_food, seed):
+    num_envs = 12
+    rng = np.random.default_rng(seed)
+
+    # Same food streams as a generation of play_serial and play_batched
+    envs = [SnakeEnv(dimensions, max_food) for _ in range(num_envs)]
+    for index, env in enumerate(envs):
+        env.reset(env_rng(seed, 0, index))
+
+    batched = BatchedSnakeEnv(num_envs, dimensions, max_food)
+    batched.reset([env_rng(seed, 0, index) for index in range(num_envs)])
+
+    alive = [True] * num_envs
+    while(any(alive)):
+        actions = [pick_action(env, rng) for env in envs]
+
+        for index, env in enumerate(envs):
+            if alive[index]:
+                alive[index] = env.step(actions[index])
+
+        assert batched.step(actions).tolist() == alive
+
+        for index, env in enumerate(envs):
+            np.testing.assert_array_equal(env.grid, batched.grid[index])
+            assert env.score == batched.score[index]
+            assert env.steps_without_food == batched.steps_without_food[index]
+            assert env.food_positions[0] == batched.food_positions[index, 0].tolist()
+
+    # Games ate and respawned food along the way
+    assert batched.score.max() > 0
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from snakeenv import SnakeEnv
+from vision import vision_inputs, batch_vision_inputs, compass
+from test_snakeenv import pick_action
+# Both vision paths have to give exactly what walking the grid one cell at a time gave
+
+# The original per-cell search, distance to the first item along a ray (1 for walls), 0 if there isn't one
+def first_found(grid, row, col, direction, item):
+    drow, dcol = direction
+    rows, cols = grid.shape
+    i, j = row + drow, col + dcol
+    distance = 1
+
+    while 0 <= i < rows and 0 <= j < cols:
+        if grid[i, j] == item:
+            return distance if item != 4 else 1.0
+
+        i += drow
+        j += dcol
+        distance += 1
+
+    return 0.0
+
+def loop_vision_inputs(env):
+    head_row, head_col = env.head_pos
+    inputs = np.zeros(22)
+
+    for i, direction in enumerate(compass):
+        inputs[i] = first_found(env.grid, head_row, head_col, direction, 3)
+        inputs[i + 8] = first_found(env.grid, head_row, head_col, direction, 4)
+
+    inputs[16] = np.sign(env.food_positions[0][0] - head_row)
+    inputs[17] = np.sign(env.food_positions[0][1] - head_col)
+    inputs[{(-1, 0): 18, (0, 1): 19, (1, 0): 20, (0, -1): 21}[tuple(env.previous_direction)]] = 1
+
+    return inputs
+
+@pytest.mark.parametrize("dimensions, max_food, seed", [
+    ([15, 15], 1, 0),
+    ([7, 12], 3, 1),
+    ([20, 9], 2, 2)
+])
+def test_vision_matches_loop(dimensions, max_food, seed):
+    rng = np.random.default_rng(seed)
+    env = SnakeEnv(dimensions, max_food, rng=np.random.default_rng(seed + 100))
+    env.reset()
+
+    for _ in range(3000):
+        expected = loop_vision_inputs(env)
+        single = vision_inputs(env.grid, env.head_pos, env.previous_direction, env.food_positions[0])
+        batched = batch_vision_inputs(
+            env.grid[None],
+            np.array([env.head_pos]),
+            np.array([env.previous_direction]),
+            np.array([env.food_positions[0]])
+        )[0]
+
+        np.testing.assert_array_equal(single, expected)
+        np.testing.assert_array_equal(batched, expected)
+
+        if not env.step(pick_action(env, rng)):
+            env.reset()
+
+def test_vision_dtype():
+    env = SnakeEnv([15, 15], 1, rng=np.random.default_rng(0))
+    env.reset()
+
+    inputs = vision_inputs(env.grid, env.head_pos, env.previous_direction, env.food_positions[0], np.float32)
+    assert inputs.dtype == np.float32
+    np.testing.assert_array_equal(inputs, loop_vision_inputs(env))
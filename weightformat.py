@@ -0,0 +1,116 @@
+import struct
+
+import numpy as np
+from neuralnetwork import NeuralNetwork
+# Flat binary format for one network or a whole population, loaded with np.memmap
+
+"""
+File layout (little endian):
+- header: magic "SNKW", version, dtype, number of networks, number of layers
+- one (rows, cols, activation) entry per layer
+- zero padding up to a 64 byte boundary
+- parameters: (networks, total parameters) block, each row is every layer flattened in order
+"""
+
+MAGIC = b"SNKW"
+VERSION = 1
+ALIGNMENT = 64
+
+header_format = "<4sI8sQII"
+layer_format = "<II8s"
+
+# Writes a (networks, total parameters) matrix with its layer shapes and activations
+def save_population(path, flat, shapes, activations, dtype=np.float32):
+    flat = np.ascontiguousarray(flat, dtype=dtype)
+
+    if flat.ndim != 2 or flat.shape[1] != sum(rows * cols for rows, cols in shapes):
+        raise ValueError("Error: Weights don't match the layer shapes.")
+
+    if len(activations) != len(shapes):
+        raise ValueError("Error: Need one activation per layer.")
+
+    header = struct.pack(header_format, MAGIC, VERSION, flat.dtype.str.encode(), len(flat), len(shapes), 0)
+    for (rows, cols), activation in zip(shapes, activations):
+        header += struct.pack(layer_format, rows, cols, activation.encode())
+
+    # Pad so the parameter block starts aligned
+    header += b"\0" * (-len(header) % ALIGNMENT)
+
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(flat.tobytes())
+
+# Writes a list of NeuralNetworks, they must all have the same shape (dtype=None keeps their own dtype)
+def save_networks(path, networks, dtype=None):
+    first = networks[0]
+    if dtype is None:
+        dtype = first.dtype
+
+    shapes = [layer.shape for layer in first.layers]
+    activations = [func.__name__ for func in first.activations]
+
+    flat = np.stack([np.concatenate([layer.ravel() for layer in network.layers]) for network in networks])
+
+    save_population(path, flat, shapes, activations, dtype)
+
+def save_network(path, network, dtype=None):
+    save_networks(path, [network], dtype)
+
+# An opened weight file, the parameter block is memory mapped so nothing is read until it's used
+class WeightArchive:
+    def __init__(self, path, mmap=True):
+        with open(path, "rb") as f:
+            header = f.read(struct.calcsize(header_format))
+            magic, version, dtype, num_networks, num_layers, _ = struct.unpack(header_format, header)
+
+            if magic != MAGIC:
+                raise ValueError(f"Error: {path} is not a weight file.")
+
+            if version != VERSION:
+                raise ValueError(f"Error: Unsupported weight file version {version}.")
+
+            self.shapes = []
+            self.activations = []
+            for _ in range(num_layers):
+                rows, cols, activation = struct.unpack(layer_format, f.read(struct.calcsize(layer_format)))
+                self.shapes.append((rows, cols))
+                self.activations.append(activation.rstrip(b"\0").decode())
+
+            offset = f.tell()
+            offset += -offset % ALIGNMENT
+
+        self.path = path
+        self.dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        self.num_networks = num_networks
+        self.neurons = [self.shapes[0][0]] + [cols for _, cols in self.shapes]
+
+        self.offsets = [0]
+        for rows, cols in self.shapes:
+            self.offsets.append(self.offsets[-1] + rows * cols)
+
+        self.num_params = self.offsets[-1]
+        shape = (num_networks, self.num_params)
+
+        if mmap:
+            self.flat = np.memmap(path, dtype=self.dtype, mode="r", offset=offset, shape=shape)
+        else:
+            self.flat = np.fromfile(path, dtype=self.dtype, count=num_networks * self.num_params, offset=offset).reshape(shape)
+
+    def __len__(self):
+        return self.num_networks
+
+    # Read-only views of one network's layers
+    def layers(self, index):
+        row = self.flat[index]
+        return [row[self.offsets[i]:self.offsets[i + 1]].reshape(shape) for i, shape in enumerate(self.shapes)]
+
+    # Builds a NeuralNetwork with one network's weights (copied into memory)
+    def network(self, index=0):
+        network = NeuralNetwork(len(self.neurons), self.neurons, self.activations, self.dtype)
+        network.layers = [np.array(layer) for layer in self.layers(index)]
+
+        return network
+
+# Loads a single network from a weight file
+def load_network(path, index=0):
+    return WeightArchive(path).network(index)
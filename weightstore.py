@@ -0,0 +1,85 @@
+import numpy as np
+from multiprocessing import shared_memory
+# Holds the weights of a whole population in one contiguous buffer
+
+class WeightStore:
+    def __init__(self, num_agents, neurons, dtype=np.float64, shared=False, name=None):
+        self.num_agents = num_agents
+        self.neurons = neurons
+        self.dtype = np.dtype(dtype)
+
+        # Layer shapes and where each layer starts inside an agent's row
+        self.shapes = [(neurons[i], neurons[i + 1]) for i in range(len(neurons) - 1)]
+        self.offsets = [0]
+        for rows, cols in self.shapes:
+            self.offsets.append(self.offsets[-1] + rows * cols)
+
+        self.num_params = self.offsets[-1]
+        nbytes = num_agents * self.num_params * self.dtype.itemsize
+
+        # Either attach to an existing shared block, make a new one, or use normal memory
+        self.shm = None
+        if name is not None:
+            self.shm = shared_memory.SharedMemory(name=name)
+        elif shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+
+        if self.shm is not None:
+            self.flat = np.ndarray((num_agents, self.num_params), dtype=self.dtype, buffer=self.shm.buf)
+        else:
+            self.flat = np.zeros((num_agents, self.num_params), dtype=self.dtype)
+
+        # Per-layer (agents, inputs, outputs) views into the flat buffer, no copies
+        self.layers = []
+        for i, shape in enumerate(self.shapes):
+            view = self.flat[:, self.offsets[i]:self.offsets[i + 1]].reshape(num_agents, *shape)
+            self.layers.append(view)
+
+        # Scratch rows that offspring get built in before being copied over the population
+        self.children = None
+
+        # Activation names, filled in by bind so the weights can be saved as whole networks
+        self.activations = None
+
+    # Name other processes use to attach to the shared block
+    @property
+    def name(self):
+        return None if self.shm is None else self.shm.name
+
+    # Views of one agent's layers
+    def agent_layers(self, index):
+        return [layer[index] for layer in self.layers]
+
+    # Copies every agent's current weights in and points their brains at the store
+    def bind(self, agents):
+        self.activations = [func.__name__ for func in agents[0].brain.activations]
+
+        for i, agent in enumerate(agents):
+            for j, layer in enumerate(self.agent_layers(i)):
+                layer[...] = agent.brain.layers[j]
+
+            agent.brain.layers = self.agent_layers(i)
+
+    # Gives every agent its own copy of its weights again so the store can be closed
+    def unbind(self, agents):
+        for agent in agents:
+            agent.brain.layers = [layer.copy() for layer in agent.brain.layers]
+
+    # Returns a reusable (num_children, num_params) scratch buffer
+    def scratch(self, num_children):
+        if self.children is None or len(self.children) != num_children:
+            self.children = np.empty((num_children, self.num_params), dtype=self.dtype)
+
+        return self.children
+
+    def close(self):
+        if self.shm is not None:
+            # Drop our views before closing the mapping
+            self.layers = []
+            self.flat = None
+            self.shm.close()
+
+    # Frees the shared block, only the process that created it should call this
+    def unlink(self):
+        if self.shm is not None:
+            self.shm.unlink()